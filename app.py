@@ -1,68 +1,67 @@
 import os
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from mongoengine import connect, disconnect # Import disconnect
 from serverless_wsgi import handle_request
-import json # For pretty printing event
-import logging # Import logging
+import json
+import logging
+import time
+from services.request_logging import (
+    configure_logging, logger, route_key, is_sampled, truncate, event_request_line, log_request_summary
+)
 
-# SET PYMONGO LOGGER TO DEBUG - Place this early, after imports
-logging.basicConfig() # Ensure basicConfig is called if not already by another module
-pymongo_logger = logging.getLogger('pymongo')
-pymongo_logger.setLevel(logging.DEBUG)
-# You might want to also set the root logger to DEBUG if pymongo doesn't output enough
-# logging.getLogger().setLevel(logging.DEBUG)
+# JSON-lines logs; level, sampling and truncation come from the environment
+# (LOG_LEVEL, PYMONGO_LOG_LEVEL, LOG_SAMPLE_RATES, LOG_BODY_MAX_CHARS)
+configure_logging()
+
+# Once per container: warn when bson/pymongo fell back to pure Python or bcrypt has no
+# build for this runtime (see services/native_check.py and `python manage.py build-layer`)
+from services.native_check import native_extension_report, missing_extensions
+_native_report = native_extension_report()
+if missing_extensions(_native_report):
+    logger.warning("C extensions missing for this runtime", extra={'nativeExtensions': _native_report})
+else:
+    logger.info("C extensions loaded", extra={'nativeExtensions': _native_report})
 
 # Import Blueprints
 from routes.posts_routes import posts_bp # Changed to direct import
 from routes.user_routes import user_bp   # Changed to direct import
+from routes.native_router import dispatch as native_dispatch
+from services.db_connection import db_connection
+from services.json_provider import MemoriesJSONProvider
 # We will add user_routes_bp later
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = MemoriesJSONProvider(app) # bson types and references in responses (services/json_provider.py)
 app.url_map.strict_slashes = False # Set strict_slashes globally for the app
 
+# Optional API Gateway fast path that skips serverless_wsgi (see routes/native_router.py)
+NATIVE_ROUTER = os.getenv("NATIVE_ROUTER", "").lower() in ("1", "true", "yes")
+
 # CORS Configuration
 CORS(app, resources={r"/*": {"origins": "*"}}) # Allow all origins for now, can be restricted later
 
 # MongoDB Connection
-CONNECTION_URL = os.getenv("CONNECTION_URL")
-
-# Connect to MongoDB when the app starts or on the first request if preferred.
-# For Lambda, it's often better to connect within the handler or ensure the connection
-# is managed correctly across invocations (e.g., check connection state).
-
-# Placeholder for database connection logic
-# We will refine this. For now, just defining it.
-def connect_db():
-    try:
-        print("CONNECT_DB: Attempting connection with PyMongo DEBUG logging enabled...")
-        if CONNECTION_URL:
-            # MongoEngine's connect is idempotent for the default connection alias if params are the same.
-            # Add serverSelectionTimeoutMS to help prevent indefinite hangs
-            connect(host=CONNECTION_URL, alias='default', serverSelectionTimeoutMS=10000) # 10-second timeout
-            print("CONNECT_DB: Successfully connected to MongoDB via MongoEngine!")
-        else:
-            print("CONNECT_DB: CONNECTION_URL not found.")
-    except Exception as e:
-        print(f"CONNECT_DB: Error connecting to MongoDB (see PyMongo DEBUG logs above for details): {e}")
-        raise # Re-raise the exception to be caught by the handler or higher up
+# There is no up-front connect: routes that query a model are wrapped in @db_required
+# (middleware/db_middleware.py), which creates the per-container client in
+# services/db_connection.py on first use and reuses it afterwards. CORS preflights,
+# GET / and requests rejected by @auth_required are answered without touching Mongo.
 
-# Logging middleware - VERY IMPORTANT FOR DEBUGGING
+# Request detail for the local development server. Under Lambda the handler below logs the
+# (truncated) event instead, so this only runs when there is no API Gateway event.
 @app.before_request
 def log_request_info():
-    # This will log before each request handled by Flask
-    print(f"FLASK_REQUEST: Path={request.path}, Method={request.method}, Headers={request.headers}")
-    if request.data:
-        try:
-            print(f"FLASK_REQUEST: Body={request.get_json()}")
-        except Exception:
-            print(f"FLASK_REQUEST: Body (non-JSON)={request.data}")
+    if request.environ.get('serverless.event') is not None or not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug("flask request", extra={
+        'route': route_key(request.method, request.path),
+        'headers': truncate(dict(request.headers)),
+        'body': truncate(request.get_data(as_text=True)),
+    })
 
 # Example Route
 @app.route('/', methods=['GET'])
 def welcome():
-    print("FLASK_ROUTING: Hit GET / fallback handler")
     return jsonify(message="welcome to the Memories API (Python/Flask)")
 
 # Register Blueprints
@@ -72,63 +71,59 @@ app.register_blueprint(user_bp) # Register the user blueprint
 
 @app.errorhandler(Exception)
 def handle_global_error(e):
-    print(f"FLASK_GLOBAL_ERROR_HANDLER: An error occurred: {e}")
+    logger.exception("unhandled error in Flask view")
     # Add CORS headers to error responses
     response = jsonify(message="Internal Server Error", error=str(e))
     response.status_code = 500
     response.headers.add('Access-Control-Allow-Origin', '*')
     return response
 
+_cold_start = True
+
 # Lambda handler function
 def lambda_handler(event, context):
-    print("LAMBDA_HANDLER: Entered")
-    # Pretty print the event if possible
-    try:
-        print(f"LAMBDA_HANDLER: Received event: {json.dumps(event, indent=2)}")
-    except Exception:
-        print(f"LAMBDA_HANDLER: Received event (raw): {event}")
-    
-    db_connected_successfully = False
-    try:
-        print("LAMBDA_HANDLER: Attempting to connect to DB...")
-        connect_db() 
-        print("LAMBDA_HANDLER: DB connection attempt finished (or was already connected).")
-        db_connected_successfully = True
-    except Exception as e:
-        print(f"LAMBDA_HANDLER: Critical error during connect_db: {e}")
-        # Return an immediate error response if DB connection fails critically
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*', "Access-Control-Allow-Headers": "Content-Type,Authorization", "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,PATCH,OPTIONS"},
-            'body': json.dumps({'message': 'Internal Server Error - DB Connection Failed', 'error': str(e)})
-        }
+    global _cold_start
+    started = time.perf_counter()
+    cold_start, _cold_start = _cold_start, False
+    method, path = event_request_line(event)
+    key = route_key(method, path)
+    sampled = is_sampled(key)
+    ensure_calls = db_connection.ensure_calls
+    if sampled and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("lambda event", extra={'route': key, 'event': truncate(event)})
 
-    # Only proceed if DB was (presumably) okay
-    if db_connected_successfully:
-        print("LAMBDA_HANDLER: Calling serverless_wsgi.handle_request...")
-        try:
+    response = None
+    dispatcher = 'native'
+    try:
+        if NATIVE_ROUTER:
+            response = native_dispatch(app, event)
+        if response is None:
+            dispatcher = 'wsgi'
             response = handle_request(app, event, context)
-            print(f"LAMBDA_HANDLER: handle_request returned (raw): {response}") 
-            # Ensure response structure is what API Gateway expects for proxy integration
-            # serverless-wsgi should handle this, but good to log for debugging.
-            return response
-        except Exception as e:
-            print(f"LAMBDA_HANDLER: Error during serverless_wsgi.handle_request: {e}")
-            return {
-                'statusCode': 500,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*', "Access-Control-Allow-Headers": "Content-Type,Authorization", "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,PATCH,OPTIONS"},
-                'body': json.dumps({'message': 'Internal Server Error - WSGI Processing', 'error': str(e)})
-            }
-    else:
-        # This case should ideally be caught by the exception block above
-        print("LAMBDA_HANDLER: DB not connected, not calling handle_request.")
-        return {
+        # Ensure response structure is what API Gateway expects for proxy integration
+        return response
+    except Exception as e:
+        logger.exception("error during serverless_wsgi.handle_request", extra={'route': key})
+        response = {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*', "Access-Control-Allow-Headers": "Content-Type,Authorization", "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,PATCH,OPTIONS"},
-            'body': json.dumps({'message': 'Internal Server Error - DB Not Connected'})
+            'body': json.dumps({'message': 'Internal Server Error - WSGI Processing', 'error': str(e)})
         }
+        return response
+    finally:
+        status = (response or {}).get('statusCode')
+        if sampled and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("lambda response", extra={'route': key, 'status': status, 'body': truncate((response or {}).get('body'))})
+        # Time spent in connection setup, only when this request was the one that connected
+        db_ms = db_connection.last_ensure_seconds * 1000 if db_connection.ensure_calls > ensure_calls else 0.0
+        log_request_summary(
+            key, status, (time.perf_counter() - started) * 1000, sampled,
+            dispatcher=dispatcher,
+            coldStart=cold_start,
+            dbConnectMs=round(db_ms, 2),
+            requestId=getattr(context, 'aws_request_id', None),
+        )
 
 if __name__ == '__main__':
-    print("Starting Flask app for local development...")
-    connect_db()
+    logger.info("Starting Flask app for local development...")
     app.run(debug=True, port=os.getenv("PORT", 5001)) 
\ No newline at end of file
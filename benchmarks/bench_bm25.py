@@ -0,0 +1,62 @@
+import argparse
+import os
+import tempfile
+import time
+from services import bm25_index
+from services.search import SEARCH_LIMIT, text_search_page
+from benchmarks.common import BENCH_CONNECTION_URL, connect_bench_db, seed_posts, time_ms, summarize
+
+# SEARCH_MODE=bm25 cost per collection size:
+#   build      - one scan of postmessages into the index file (what a cold container pays once)
+#   open       - mapping an existing file, as a new runtime in a warm container does
+#   bm25 rank  - Bm25Index.search alone, first page of SEARCH_LIMIT ids
+#   bm25 page  - bm25_search_page: ranking plus the _id $in fetch of the page's rows
+#   text       - the Mongo $text page it replaces (skipped on mongomock, which has no $text)
+# The index file goes to a temporary directory, not BM25_INDEX_PATH.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process BM25 index build and search latency")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--query', default='sunset river')
+    parser.add_argument('--tags', nargs='*', default=['food'])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    connect_bench_db()
+    has_text = not BENCH_CONNECTION_URL.startswith('mongomock://')
+    workdir = tempfile.mkdtemp(prefix='bench-bm25-')
+    bm25_index.BM25_INDEX_PATH = os.path.join(workdir, 'posts.idx')
+    bm25_index.BM25_BUILD_MAX_DOCS = max(args.sizes)
+    terms = bm25_index.tokenize(' '.join([args.query] + args.tags))
+
+    print(f"{'posts':>8} {'build ms':>9} {'file MB':>8} {'open ms':>8}  {'case':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for size in args.sizes:
+        seed_posts(size)
+        bm25_index._discard()
+        if os.path.exists(bm25_index.BM25_INDEX_PATH):
+            os.remove(bm25_index.BM25_INDEX_PATH)
+        t0 = time.perf_counter()
+        index = bm25_index.get_index()
+        build_ms = (time.perf_counter() - t0) * 1000
+        file_mb = os.path.getsize(bm25_index.BM25_INDEX_PATH) / 2**20
+        t0 = time.perf_counter()
+        bm25_index.Bm25Index(bm25_index.BM25_INDEX_PATH).close()
+        open_ms = (time.perf_counter() - t0) * 1000
+
+        cases = [
+            ('bm25 rank', lambda: index.search(terms, None, SEARCH_LIMIT)),
+            ('bm25 page', lambda: bm25_index.bm25_search_page(args.query, args.tags, None, SEARCH_LIMIT)),
+        ]
+        if has_text:
+            cases.append(('text', lambda: text_search_page(args.query, args.tags, None, SEARCH_LIMIT)))
+        for i, (name, fn) in enumerate(cases):
+            stats = summarize(time_ms(fn, args.repeat))
+            prefix = f"{size:>8} {build_ms:>9.1f} {file_mb:>8.2f} {open_ms:>8.2f}" if i == 0 else ' ' * 36
+            print(f"{prefix}  {name:>9} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['p99']:>9.2f}")
+    bm25_index._discard()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+import argparse
+import datetime
+import random
+from bson import ObjectId
+from models.comment import Comment
+from services.pagination import pack_cursor
+from services.post_comments import COMMENT_MAX_DEPTH, THREAD_MAX_LIMIT, thread_fields, thread_queryset
+from benchmarks.common import connect_bench_db, time_ms, summarize
+
+# Loading one large reply thread (--comments replies under one top-level comment):
+#   path      - thread_queryset(), one range of the (ancestors.comment, path, ancestors.maxRank)
+#               index, paged by THREAD_MAX_LIMIT
+#   recursive - one query per comment for its replies, on the (post, parent, createdAt) index,
+#               the way a tree keyed only by parent has to be read
+# for the whole subtree and for the first --per-level replies per level. Both must return the
+# same comments in the same order; exits 1 if they do not.
+
+
+def seed_thread(count, seed=42):
+    """A top-level comment and `count` replies under it; returns (post id, top-level comment id)."""
+    rng = random.Random(seed)
+    collection = Comment._get_collection()
+    collection.drop()
+    Comment.ensure_indexes()
+    post_id = ObjectId()
+    start = datetime.datetime(2024, 1, 1)
+    def comment(i, parent):
+        comment_id = ObjectId()
+        rank = 0
+        if parent is not None:
+            parent['replyCount'] += 1
+            rank = parent['replyCount']
+        row = {'_id': comment_id, 'post': post_id, 'author': None, 'text': f"Reply #{i}",
+               'createdAt': start + datetime.timedelta(milliseconds=i)}
+        row.update(thread_fields(comment_id, parent, rank))
+        return row
+    rows = [comment(0, None)]
+    for i in range(1, count + 1):
+        # Mostly answers to recent comments, so the thread gets both deep chains and wide fans
+        parent = rows[rng.randrange(max(0, len(rows) - 50), len(rows))] if rng.random() < 0.8 else rng.choice(rows)
+        if parent['depth'] >= COMMENT_MAX_DEPTH - 1:
+            parent = rows[0]
+        rows.append(comment(i, parent))
+    collection.insert_many(rows)
+    return post_id, rows[0]['_id']
+
+
+def path_fetch(post_id, root_id, per_level):
+    rows, cursor, queries = [], '', 0
+    while True:
+        page = list(thread_queryset(post_id, root_id, per_level, cursor, THREAD_MAX_LIMIT))
+        queries += 1
+        rows += page[:THREAD_MAX_LIMIT]
+        if len(page) <= THREAD_MAX_LIMIT:
+            return [row['_id'] for row in rows], queries
+        cursor = pack_cursor([page[THREAD_MAX_LIMIT - 1]['path']])
+
+
+def recursive_fetch(post_id, root_id, per_level):
+    collection = Comment._get_collection()
+    ids, queries = [root_id], 0
+    def walk(parent_id):
+        nonlocal queries
+        replies = collection.find({'post': post_id, 'parent': parent_id}, {'_id': 1}).sort([('createdAt', 1), ('_id', 1)])
+        if per_level is not None:
+            replies = replies.limit(per_level)
+        queries += 1
+        for reply in list(replies):
+            ids.append(reply['_id'])
+            walk(reply['_id'])
+    walk(root_id)
+    return ids, queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reply thread loading, materialized path vs recursive")
+    parser.add_argument('--comments', type=int, default=10000)
+    parser.add_argument('--per-level', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    connect_bench_db()
+    post_id, root_id = seed_thread(args.comments)
+
+    print(f"{'shape':>10} {'method':>10} {'queries':>8} {'rows':>7} {'p50 ms':>9} {'p95 ms':>9}")
+    failures = 0
+    for shape, per_level in (('subtree', None), (f'first {args.per_level}', args.per_level)):
+        results = {}
+        for method, fetch in (('path', path_fetch), ('recursive', recursive_fetch)):
+            ids, queries = fetch(post_id, root_id, per_level)
+            results[method] = ids
+            stats = summarize(time_ms(lambda: fetch(post_id, root_id, per_level), args.repeat))
+            print(f"{shape:>10} {method:>10} {queries:>8} {len(ids):>7} {stats['p50']:>9.2f} {stats['p95']:>9.2f}")
+        if results['path'] != results['recursive']:
+            print(f"{shape}: the two methods disagree")
+            failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,33 @@
+import argparse
+from mongoengine import connect, disconnect
+from services.db_connection import ConnectionManager
+from benchmarks.common import bench_connect_kwargs, time_ms, summarize
+
+# Per-invocation connection overhead on a warm container:
+#   legacy  - what lambda_handler used to do on every call: mongoengine connect(...) again
+#   manager - ConnectionManager.ensure() on a healthy connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-invocation connection overhead")
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+    kwargs = bench_connect_kwargs()
+
+    disconnect(alias='default')
+    legacy = summarize(time_ms(lambda: connect(alias='default', serverSelectionTimeoutMS=10000, **kwargs), args.repeat))
+
+    disconnect(alias='default')
+    host = kwargs.pop('host')
+    manager = ConnectionManager(host, serverSelectionTimeoutMS=10000, **kwargs)
+    manager.ensure() # Cold: creates the client
+    warm = summarize(time_ms(manager.ensure, args.repeat))
+
+    print(f"{'path':>8} {'p50 us':>8} {'p99 us':>8}")
+    print(f"{'legacy':>8} {legacy['p50'] * 1000:>8.1f} {legacy['p99'] * 1000:>8.1f}")
+    print(f"{'manager':>8} {warm['p50'] * 1000:>8.1f} {warm['p99'] * 1000:>8.1f}")
+    print(manager.stats())
+
+
+if __name__ == '__main__':
+    main()
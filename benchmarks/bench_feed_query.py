@@ -0,0 +1,32 @@
+import argparse
+from services import feed_query, post_count
+from benchmarks.common import connect_bench_db, seed_posts, time_ms, summarize
+
+# Legacy ?page=N feed latency per FEED_QUERY_MODE: one $facet aggregation vs count + find.
+# Round-trip savings only show up against a remote server (e.g. Atlas from a Lambda region).
+# Both modes run with POST_COUNT_STRATEGY=exact, the only setting where facet is used at all;
+# the default estimated count makes split cheaper than either.
+LIMIT = 8
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feed page latency, facet vs split")
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    connect_bench_db()
+    seed_posts(args.posts)
+    post_count.POST_COUNT_STRATEGY = 'exact'
+
+    print(f"{'page':>6} {'mode':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for page in args.pages:
+        for mode in ('split', 'facet'):
+            feed_query.FEED_QUERY_MODE = mode
+            stats = summarize(time_ms(lambda: feed_query.fetch_feed_page((page - 1) * LIMIT, LIMIT), args.repeat))
+            print(f"{page:>6} {mode:>6} {stats['p50']:>8.2f} {stats['p95']:>8.2f} {stats['p99']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
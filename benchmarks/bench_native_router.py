@@ -0,0 +1,50 @@
+import argparse
+import jwt
+from serverless_wsgi import handle_request
+from app import app
+from middleware.auth_middleware import JWT_SECRET
+from routes.native_router import dispatch
+from benchmarks.common import connect_bench_db, seed_posts, time_ms, summarize
+
+# Per-invocation overhead of serverless_wsgi + Flask vs the native API Gateway router.
+# The default routes never reach Mongo, so the difference is pure dispatch cost.
+# --posts N also seeds BENCH_CONNECTION_URL and times GET /posts?page=1 end to end.
+
+
+def rest_event(method, path, query=None, token=None):
+    headers = {'Host': 'abc123.execute-api.us-east-1.amazonaws.com', 'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    return {
+        'httpMethod': method, 'path': path, 'headers': headers, 'queryStringParameters': query,
+        'body': None, 'isBase64Encoded': False, 'requestContext': {'stage': 'prod'},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="serverless_wsgi vs native router overhead")
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--posts', type=int, default=0)
+    args = parser.parse_args()
+
+    token = jwt.encode({'id': '000000000000000000000001', 'email': 'bench@example.com'}, JWT_SECRET, algorithm="HS256")
+    events = {
+        'POST /posts (401)': rest_event('POST', '/posts'),
+        'GET /posts/signed-url/upload (400)': rest_event('GET', '/posts/signed-url/upload', token=token),
+    }
+    repeat = {name: args.repeat for name in events}
+    if args.posts:
+        connect_bench_db()
+        seed_posts(args.posts)
+        events['GET /posts?page=1'] = rest_event('GET', '/posts', {'page': '1'})
+        repeat['GET /posts?page=1'] = max(args.repeat // 20, 10)
+
+    print(f"{'route':<36} {'wsgi p50 us':>12} {'native p50 us':>14}")
+    for name, event in events.items():
+        wsgi = summarize(time_ms(lambda: handle_request(app, event, None), repeat[name]))
+        native = summarize(time_ms(lambda: dispatch(app, event), repeat[name]))
+        print(f"{name:<36} {wsgi['p50'] * 1000:>12.1f} {native['p50'] * 1000:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
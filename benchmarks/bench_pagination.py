@@ -0,0 +1,44 @@
+import argparse
+from models.post_message import PostMessage
+from services.pagination import keyset_page
+from benchmarks.common import connect_bench_db, seed_posts, time_ms, summarize
+
+# Feed page latency by depth: legacy skip()/limit() paging vs keyset cursors.
+# Skip latency grows with the page number; cursor latency should stay flat.
+LIMIT = 8
+
+
+def skip_page(page):
+    return list(PostMessage.objects.order_by('-id').skip((page - 1) * LIMIT).limit(LIMIT))
+
+
+def cursor_at(page):
+    # Walk the cursor chain up to `page` so the timed call starts from a real nextCursor
+    cursor = ''
+    for _ in range(page - 1):
+        _, cursor = keyset_page(PostMessage.objects, cursor, LIMIT)
+    return cursor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feed page latency by depth, skip vs cursor")
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 500, 2000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    connect_bench_db()
+    seed_posts(args.posts)
+
+    print(f"{'page':>6} {'skip p50 ms':>12} {'cursor p50 ms':>14}")
+    for page in args.pages:
+        if (page - 1) * LIMIT >= args.posts:
+            continue
+        cursor = cursor_at(page)
+        skip_stats = summarize(time_ms(lambda: skip_page(page), args.repeat))
+        cursor_stats = summarize(time_ms(lambda: keyset_page(PostMessage.objects, cursor, LIMIT), args.repeat))
+        print(f"{page:>6} {skip_stats['p50']:>12.2f} {cursor_stats['p50']:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import argparse
+from models.post_message import PostMessage
+from services.post_reader import POST_LIST_PROJECTION, list_queryset
+from services.post_serializer import serialize_post
+from benchmarks.common import connect_bench_db, seed_posts, time_ms, summarize
+
+# Post list serialization cost, MongoEngine hydration vs the raw path (services/post_reader.py)
+# with the shared serializer (services/post_serializer.py) and the app's JSON provider.
+#   query   - fetch + serialize + encode n posts, the way the list endpoints do it
+#             (hydrated to_json_serializable() also loads each post's creator)
+#   convert - rows already in memory: _from_son() + to_mongo() vs serialize_post()
+#   encode  - app.json.dumps() of n serialized posts (ObjectId/datetime via the provider)
+# Before timing, every size is checked to produce byte-identical JSON on both paths.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hydrated vs raw list serialization")
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    import app
+    dumps = app.app.json.dumps
+    connect_bench_db()
+    seed_posts(max(args.posts, max(args.sizes)))
+
+    def hydrated(n):
+        return dumps([post.to_json_serializable() for post in PostMessage.objects.order_by('-id').limit(n)])
+
+    def raw(n):
+        return dumps([serialize_post(doc) for doc in list_queryset().order_by('-id').limit(n)])
+
+    print(f"{'docs':>6} {'case':>8} {'path':>9} {'p50 ms':>9} {'p95 ms':>9} {'us/doc':>8}")
+    for n in args.sizes:
+        if hydrated(n) != raw(n):
+            print(f"{n:>6} output differs between the hydrated and raw paths")
+            return 1
+
+        rows = list(PostMessage._get_collection().find({}, POST_LIST_PROJECTION).sort('_id', -1).limit(n))
+        serialized = [serialize_post(doc) for doc in rows]
+        cases = [
+            ('query', 'hydrated', lambda: hydrated(n)),
+            ('query', 'raw', lambda: raw(n)),
+            ('convert', 'hydrated', lambda: [PostMessage._from_son(doc).to_mongo().to_dict() for doc in rows]),
+            ('convert', 'raw', lambda: [serialize_post(doc) for doc in rows]),
+            ('encode', 'provider', lambda: dumps(serialized)),
+        ]
+        for case, path, fn in cases:
+            stats = summarize(time_ms(fn, args.repeat))
+            print(f"{n:>6} {case:>8} {path:>9} {stats['p50']:>9.3f} {stats['p95']:>9.3f} "
+                  f"{stats['p50'] * 1000 / n:>8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,44 @@
+import argparse
+from services.pagination import keyset_page
+from services.post_reader import search_queryset
+from services.search import SEARCH_LIMIT, text_search_page
+from benchmarks.common import BENCH_CONNECTION_URL, connect_bench_db, seed_posts, time_ms, summarize
+
+# /posts/search latency per SEARCH_MODE as the collection grows.
+#   regex           - title icontains OR tags $in, first keyset page of SEARCH_LIMIT; every
+#                     title in the index is still matched against the pattern
+#   regex unbounded - the same query returning every hit, as search did before it was paged
+#   text            - $text over the post_text index, first page of SEARCH_LIMIT by relevance
+# Needs a real mongod: mongomock implements neither $text nor the index behaviour measured here.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search latency, regex vs text index")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--query', default='sunset')
+    parser.add_argument('--tags', nargs='*', default=['food'])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if BENCH_CONNECTION_URL.startswith('mongomock://'):
+        print("mongomock has no $text support; point BENCH_CONNECTION_URL at a mongod")
+        return 1
+    connect_bench_db()
+
+    cases = [
+        ('regex', lambda: keyset_page(search_queryset(args.query, args.tags), None, SEARCH_LIMIT)),
+        ('regex unbounded', lambda: (list(search_queryset(args.query, args.tags)), None)),
+        ('text', lambda: text_search_page(args.query, args.tags, None, SEARCH_LIMIT)),
+    ]
+    print(f"{'posts':>8} {'mode':>15} {'hits':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for size in args.sizes:
+        seed_posts(size) # Also builds the declared indexes, including post_text
+        for mode, fn in cases:
+            hits = len(fn()[0])
+            stats = summarize(time_ms(fn, args.repeat))
+            print(f"{size:>8} {mode:>15} {hits:>7} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['p99']:>9.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
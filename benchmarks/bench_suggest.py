@@ -0,0 +1,62 @@
+import argparse
+import random
+import string
+import time
+from services.suggest_index import SUGGEST_LIMIT, PrefixIndex, normalize
+from benchmarks.common import time_ms, summarize
+
+# /posts/suggest latency per keystroke with a large tag vocabulary.
+# Builds the PrefixIndex directly from synthetic (tag, count) pairs, so no Mongo is needed:
+# the endpoint's cost after the per-container build is the lookup measured here.
+#   cold - first request for that prefix (a range scan; short prefixes are then memoized)
+#   warm - the same prefix again
+#   add  - one incremental count change (a new post's tag), which also drops memoized prefixes
+
+
+def synthetic_tags(count, seed=42):
+    rng = random.Random(seed)
+    counts = {}
+    while len(counts) < count:
+        tag = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12)))
+        counts[tag] = int(rng.paretovariate(1.2)) # A few very common tags, a long tail of rare ones
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefix suggestion latency per keystroke")
+    parser.add_argument('--tags', type=int, default=1_000_000)
+    parser.add_argument('--word', default='summertrip')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    counts = synthetic_tags(args.tags)
+    t0 = time.perf_counter()
+    index = PrefixIndex(counts, {tag: tag for tag in counts})
+    print(f"{len(index)} tags, build {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    word = normalize(args.word)
+    print(f"{'prefix':>12} {'range':>8} {'cold ms':>9} {'warm p50':>9} {'warm p99':>9}")
+    for end in range(1, len(word) + 1):
+        prefix = word[:end]
+        t0 = time.perf_counter()
+        index.top(prefix, SUGGEST_LIMIT)
+        cold = (time.perf_counter() - t0) * 1000
+        stats = summarize(time_ms(lambda: index.top(prefix, SUGGEST_LIMIT), args.repeat))
+        lo, hi = index.span(prefix)
+        print(f"{prefix:>12} {hi - lo:>8} {cold:>9.3f} {stats['p50']:>9.3f} {stats['p99']:>9.3f}")
+
+    rng = random.Random(7)
+    new_tags = [word[:rng.randint(1, len(word))] + ''.join(rng.choices(string.ascii_lowercase, k=4))
+                for _ in range(args.repeat)]
+    samples = []
+    for tag in new_tags:
+        t0 = time.perf_counter()
+        index.add(tag, tag, 1)
+        samples.append((time.perf_counter() - t0) * 1000)
+    stats = summarize(samples)
+    print(f"add: p50 {stats['p50']:.3f} ms, p99 {stats['p99']:.3f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
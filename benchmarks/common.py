@@ -0,0 +1,147 @@
+import datetime
+import functools
+import os
+import random
+import statistics
+import time
+from bson import ObjectId
+from mongoengine import disconnect
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+from models.post_message import PostMessage
+from models.user_model import User # Registers 'User' for PostMessage.creator
+from services.db_connection import db_connection
+
+# Shared helpers for the benchmark scripts in this folder.
+# Run them from the repository root, e.g. `python -m benchmarks.bench_pagination`.
+# They need a Mongo they are allowed to wipe: BENCH_CONNECTION_URL, defaulting to a local
+# mongod. `mongomock://localhost/<db>` works too for a quick smoke run, but its timings say
+# nothing about a real server. tests/ uses the same database, and skips what needs a real mongod
+# (query plans, command events, several processes) when real_mongod_available() is False.
+BENCH_CONNECTION_URL = os.getenv("BENCH_CONNECTION_URL", "mongodb://localhost:27017/memories_bench")
+
+SAMPLE_TAGS = ['travel', 'food', 'nature', 'city', 'family', 'beach', 'music', 'art', 'sport', 'pets']
+SAMPLE_WORDS = ['sunset', 'mountain', 'coffee', 'river', 'street', 'concert', 'garden', 'winter',
+                'market', 'harbor', 'forest', 'museum', 'picnic', 'bridge', 'festival', 'island']
+
+
+def bench_connect_kwargs(url=None):
+    """mongoengine connect() arguments for `url` (default BENCH_CONNECTION_URL)."""
+    url = url or BENCH_CONNECTION_URL
+    if url.startswith('mongomock://'):
+        import mongomock
+        db_name = url.rsplit('/', 1)[-1] or 'memories_bench'
+        return {'db': db_name, 'host': 'mongodb://localhost', 'mongo_client_class': mongomock.MongoClient}
+    return {'host': url}
+
+
+@functools.lru_cache(maxsize=None)
+def real_mongod_available():
+    """True if BENCH_CONNECTION_URL is a mongod (not mongomock) that answers a ping within a second."""
+    if BENCH_CONNECTION_URL.startswith('mongomock://'):
+        return False
+    client = MongoClient(BENCH_CONNECTION_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command('ping')
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+def connect_bench_db(url=None):
+    # Points the app's own connection manager at the benchmark database (or `url`), so routes
+    # guarded by @db_required use it too
+    disconnect(alias='default')
+    kwargs = bench_connect_kwargs(url)
+    db_connection.host = kwargs.pop('host')
+    db_connection.client_settings = kwargs
+    db_connection.state = 'disconnected'
+    db_connection.ensure()
+
+
+def make_post_doc(i, created_at, rng, creators):
+    title_words = rng.sample(SAMPLE_WORDS, 3)
+    return {
+        '_id': ObjectId(),
+        'title': ' '.join(title_words).title(),
+        'message': f"Memory #{i}: " + ' '.join(rng.choices(SAMPLE_WORDS, k=20)),
+        'name': f"User {i % len(creators)}",
+        'creator': creators[i % len(creators)],
+        'tags': rng.sample(SAMPLE_TAGS, 2),
+        'selectedFile': f"uploads/{i}.jpg",
+        'likeCount': rng.randint(0, 5),
+        'createdAt': created_at,
+    }
+
+
+def seed_users(count=50):
+    users = User._get_collection()
+    users.drop()
+    docs = [{'_id': ObjectId(), 'name': f"User {i}", 'email': f"user{i}@example.com", 'password': 'x'}
+            for i in range(count)]
+    users.insert_many(docs)
+    return [doc['_id'] for doc in docs]
+
+
+def seed_posts(count, seed=42):
+    """Drops the posts and users collections and inserts `count` synthetic posts."""
+    rng = random.Random(seed)
+    creators = seed_users()
+    collection = PostMessage._get_collection()
+    collection.drop()
+    PostMessage.ensure_indexes()
+    start = datetime.datetime(2024, 1, 1)
+    batch = []
+    for i in range(count):
+        batch.append(make_post_doc(i, start + datetime.timedelta(seconds=i), rng, creators))
+        if len(batch) == 1000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+    return collection
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts Mongo commands by name and by collection. Register it before connecting;
+    mongomock emits no command events."""
+    def __init__(self):
+        self.count = 0
+        self.names = {}
+        self.collections = {}
+
+    def started(self, event):
+        self.count += 1
+        self.names[event.command_name] = self.names.get(event.command_name, 0) + 1
+        collection = event.command.get(event.command_name)
+        if isinstance(collection, str):
+            self.collections[collection] = self.collections.get(collection, 0) + 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def time_ms(fn, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+    return {
+        'p50': statistics.median(ordered),
+        'p95': pct(95),
+        'p99': pct(99),
+        'mean': statistics.fmean(ordered),
+    }
@@ -0,0 +1,183 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# Replays recorded API Gateway events through app.lambda_handler and writes a JSON report:
+#   init       - `import app` wall time in fresh interpreters, plus the first (cold) invocation
+#   per route  - warm p50/p95/p99, peak allocation per request, Mongo commands per request
+# Run from the repository root against a Mongo it may wipe (see benchmarks/common.py):
+#   python -m benchmarks.harness --out bench_results.json [--baseline previous.json]
+# Events live in benchmarks/events/*.json, one proxy event per file, named after the file.
+# "{{post_id}}" and "{{token}}" inside them are filled in after seeding.
+
+os.environ.setdefault("LOG_LEVEL", "WARNING") # One summary line per request would drown the report
+
+from pymongo import monitoring
+from benchmarks.common import CommandCounter
+
+EVENTS_DIR = os.path.join(os.path.dirname(__file__), 'events')
+# Settings that change what a run measures; recorded with the results
+CONFIG_ENV = ['NATIVE_ROUTER', 'FEED_QUERY_MODE', 'POST_COUNT_STRATEGY', 'SEARCH_MODE', 'LIKE_INGEST_MODE', 'MONGO_MAX_POOL_SIZE', 'MONGO_COMPRESSORS']
+
+
+# Registered before any client exists so every client the app creates reports to it
+command_counter = CommandCounter()
+monitoring.register(command_counter)
+
+
+def measure_import_seconds(runs):
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    env = dict(os.environ, CONNECTION_URL="")
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env)
+        if result.returncode == 0:
+            samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def load_events(pattern):
+    events = {}
+    for path in sorted(glob.glob(os.path.join(EVENTS_DIR, pattern))):
+        with open(path) as f:
+            events[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return events
+
+
+def fill(raw_event, values):
+    for key, value in values.items():
+        raw_event = raw_event.replace('{{' + key + '}}', value)
+    return json.loads(raw_event)
+
+
+class LambdaContext:
+    aws_request_id = 'harness'
+    function_name = 'memories-backend-harness'
+
+
+def run_route(lambda_handler, event, repeat):
+    from benchmarks.common import summarize
+    context = LambdaContext()
+    statuses = {}
+    durations = []
+    commands_before = command_counter.count
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        response = lambda_handler(event, context)
+        durations.append((time.perf_counter() - t0) * 1000)
+        statuses[response.get('statusCode')] = statuses.get(response.get('statusCode'), 0) + 1
+    commands = command_counter.count - commands_before
+
+    # Separate pass: tracemalloc slows everything down, so it is kept out of the timings
+    alloc_peaks = []
+    tracemalloc.start()
+    for _ in range(min(repeat, 20)):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        lambda_handler(event, context)
+        _, peak = tracemalloc.get_traced_memory()
+        alloc_peaks.append(peak - before)
+    tracemalloc.stop()
+
+    stats = summarize(durations)
+    return {
+        'requests': repeat,
+        'statuses': {str(k): v for k, v in statuses.items()},
+        'p50Ms': round(stats['p50'], 3),
+        'p95Ms': round(stats['p95'], 3),
+        'p99Ms': round(stats['p99'], 3),
+        'meanMs': round(stats['mean'], 3),
+        'allocPeakKiB': round(sorted(alloc_peaks)[len(alloc_peaks) // 2] / 1024, 1),
+        'mongoCommandsPerRequest': round(commands / repeat, 2),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n{'route':<28} {'p50 ms':>9} {'base':>9} {'delta':>8} {'cmds':>6} {'base':>6}")
+    for name, route in results['routes'].items():
+        old = baseline.get('routes', {}).get(name)
+        if not old:
+            continue
+        delta = (route['p50Ms'] - old['p50Ms']) / old['p50Ms'] * 100 if old['p50Ms'] else 0.0
+        print(f"{name:<28} {route['p50Ms']:>9.2f} {old['p50Ms']:>9.2f} {delta:>+7.1f}% "
+              f"{str(route['mongoCommandsPerRequest']):>6} {str(old['mongoCommandsPerRequest']):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded API Gateway events through lambda_handler")
+    parser.add_argument('--events', default='*.json', help="glob inside benchmarks/events")
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--import-runs', type=int, default=5)
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--baseline', help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    import_samples = measure_import_seconds(args.import_runs)
+
+    t0 = time.perf_counter()
+    import app
+    import_seconds = time.perf_counter() - t0
+    import jwt
+    from middleware.auth_middleware import JWT_SECRET
+    from models.post_message import PostMessage
+    from benchmarks.common import BENCH_CONNECTION_URL, connect_bench_db, seed_posts
+
+    connect_bench_db()
+    seed_posts(args.posts)
+    first_post = PostMessage.objects.order_by('-id').first()
+    values = {
+        'post_id': str(first_post.id),
+        'token': jwt.encode({'id': str(first_post._data['creator'].id), 'email': 'user0@example.com'},
+                            JWT_SECRET, algorithm="HS256"),
+    }
+    events = {name: fill(raw, values) for name, raw in load_events(args.events).items()}
+
+    cold_ms = None
+    routes = {}
+    for name, event in events.items():
+        if cold_ms is None:
+            t0 = time.perf_counter()
+            app.lambda_handler(event, LambdaContext())
+            cold_ms = (time.perf_counter() - t0) * 1000
+        app.lambda_handler(event, LambdaContext()) # Warm this route before timing it
+        routes[name] = run_route(app.lambda_handler, event, args.repeat)
+        print(f"{name:<28} p50 {routes[name]['p50Ms']:>8.2f} ms  p99 {routes[name]['p99Ms']:>8.2f} ms  "
+              f"alloc {routes[name]['allocPeakKiB']:>7.1f} KiB  cmds {routes[name]['mongoCommandsPerRequest']}")
+
+    results = {
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'mongo': 'mongomock' if BENCH_CONNECTION_URL.startswith('mongomock://') else 'mongod',
+        'config': {name: os.getenv(name) for name in CONFIG_ENV},
+        'posts': args.posts,
+        'init': {
+            'importMsSamples': [round(s * 1000, 2) for s in import_samples],
+            'importMsInProcess': round(import_seconds * 1000, 2),
+            'firstInvocationMs': round(cold_ms or 0.0, 2),
+        },
+        'routes': routes,
+    }
+    if results['mongo'] == 'mongomock':
+        # mongomock emits no command events, so the counts are meaningless there
+        for route in routes.values():
+            route['mongoCommandsPerRequest'] = None
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\nwrote {args.out}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
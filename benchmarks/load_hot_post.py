@@ -0,0 +1,71 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from models.like import Like
+from models.like_event import LikeEvent
+from services import like_ingest
+from services.post_likes import set_like
+from benchmarks.common import connect_bench_db, seed_posts, summarize
+
+# Likes on a single hot post per LIKE_INGEST_MODE (services/like_ingest.py): --users distinct
+# users each like the post once, --workers at a time.
+#   calls/s, p50/p99 - like request throughput and latency
+#   lag              - likeCount readers would see right after the burst, minus the real count
+#   own missing      - responses whose likeCount did not include the caller's own like
+#   final            - whether likeCount equals the likes collection after flushing
+# Exits 1 if any mode ends with a wrong count or hides a caller's own like. Needs a real
+# mongod for --workers > 1: mongomock's collections are not thread-safe.
+
+
+def run(post_id, users, workers):
+    latencies = []
+    own_missing = []
+    def like(user_id):
+        t0 = time.perf_counter()
+        post, liked = set_like(post_id, user_id, True)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if not liked or post['likeCount'] < 1:
+            own_missing.append(user_id)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(like, users))
+    return latencies, time.perf_counter() - t0, len(own_missing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Like ingestion on one hot post")
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=64)
+    parser.add_argument('--modes', nargs='+', default=['direct', 'events', 'buffer'])
+    args = parser.parse_args()
+
+    connect_bench_db()
+    collection = seed_posts(1)
+    Like.ensure_indexes()
+    LikeEvent.ensure_indexes()
+    post_id = collection.find_one()['_id']
+
+    print(f"{'mode':>7} {'calls/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'lag':>6} {'own missing':>12} {'final':>6}")
+    failures = 0
+    for mode in args.modes:
+        like_ingest.LIKE_INGEST_MODE = mode
+        Like._get_collection().delete_many({'post': post_id})
+        LikeEvent._get_collection().delete_many({})
+        collection.update_one({'_id': post_id}, {'$set': {'likeCount': 0}})
+        users = [str(ObjectId()) for _ in range(args.users)]
+
+        latencies, seconds, own_missing = run(post_id, users, args.workers)
+        lag = collection.find_one({'_id': post_id})['likeCount'] - args.users
+        while like_ingest.flush(): # What the next triggers or `manage.py flush-likes` would do
+            pass
+        final = collection.find_one({'_id': post_id})['likeCount'] == Like.objects(post=post_id).count() == args.users
+        failures += own_missing + (not final)
+        stats = summarize(latencies)
+        print(f"{mode:>7} {len(latencies) / seconds:>9.0f} {stats['p50']:>8.2f} {stats['p99']:>8.2f} "
+              f"{lag:>6} {own_missing:>12} {str(final):>6}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
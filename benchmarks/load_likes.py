@@ -0,0 +1,91 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from models.like import Like
+from services.post_likes import set_like, toggle_like
+from benchmarks.common import connect_bench_db, seed_posts, summarize
+
+# Concurrency check for like changes on one post. Each of --users users fires --toggles
+# toggles at once (a double or triple click, retries), all users in parallel, through
+# services.post_likes.toggle_like. A user ends up liking the post iff they toggled an odd
+# number of times, and the post's likeCount must equal its documents in the likes collection.
+# A second phase sends like/unlike (set_like) in sequence per user, users in parallel, and
+# checks the outcome is the last state each user asked for.
+# Prints the mismatches and latency; exits 1 if there are any. tests/test_likes.py asserts the
+# same with toggle_storm()/set_sequences(), threaded on mongomock and across processes on a
+# mongod. Needs ensure-indexes (or seed_posts' own) to have built the unique (post, user) index.
+
+
+def check(collection, post_id, expected):
+    liked = [doc['user'] for doc in Like._get_collection().find({'post': post_id}, {'user': 1})]
+    count = collection.find_one({'_id': post_id}, {'likeCount': 1}).get('likeCount', 0)
+    wrong = len(set(liked) ^ expected)
+    drift = count - len(liked)
+    return wrong, drift
+
+
+def reset(collection, post_id):
+    Like._get_collection().delete_many({'post': post_id})
+    collection.update_one({'_id': post_id}, {'$set': {'likeCount': 0}})
+
+
+def toggle_storm(post_id, users, toggles, workers):
+    """`toggles` parallel toggle_like calls per user, all users at once; returns their latencies (ms)."""
+    latencies = []
+    def toggle(user_id):
+        t0 = time.perf_counter()
+        toggle_like(post_id, user_id)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(toggle, [user for user in users for _ in range(toggles)]))
+    return latencies
+
+
+def toggle_in_process(post_id, users, toggles, workers):
+    """toggle_storm() in a process of its own, with its own client (for a ProcessPoolExecutor)."""
+    connect_bench_db()
+    toggle_storm(post_id, users, toggles, workers)
+
+
+def set_sequences(post_id, users, toggles, workers):
+    """Every user sends like, unlike, like... (`toggles` calls) one after another; users in parallel."""
+    def sequence(user_id):
+        for i in range(toggles):
+            set_like(post_id, user_id, i % 2 == 0)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(sequence, users))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel like toggles on one post")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--toggles', type=int, default=3, help="parallel toggles per user")
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+
+    connect_bench_db()
+    collection = seed_posts(1)
+    Like.ensure_indexes()
+    post_id = collection.find_one()['_id']
+    users = [str(ObjectId()) for _ in range(args.users)]
+    expected = set(users) if args.toggles % 2 else set()
+
+    print(f"{'path':>8} {'calls':>7} {'wrong':>6} {'drift':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    reset(collection, post_id)
+    latencies = toggle_storm(post_id, users, args.toggles, args.workers)
+    wrong, drift = check(collection, post_id, expected)
+    failures = wrong + abs(drift)
+    stats = summarize(latencies)
+    print(f"{'toggle':>8} {len(latencies):>7} {wrong:>6} {drift:>6} {stats['p50']:>8.2f} {stats['p99']:>8.2f}")
+
+    reset(collection, post_id)
+    set_sequences(post_id, users, args.toggles, args.workers)
+    wrong, drift = check(collection, post_id, expected)
+    failures += wrong + abs(drift)
+    print(f"{'set':>8} {len(users) * args.toggles:>7} {wrong:>6} {drift:>6}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Development and maintenance commands. Run from the repository root:
+#   python manage.py importtime        cold-start import profile of `import app`
+#   python manage.py check-imports     fail if `import app` loads modules requests do not need
+#   python manage.py build-layer       build the Lambda dependency layer zip (tools/build_layer.py)
+#   python manage.py native-check      report whether bson/pymongo/bcrypt C extensions load here
+#   python manage.py ensure-indexes    create the indexes the models declare (tools/indexes.py)
+#   python manage.py explain-check     fail if a route's query plan has a COLLSCAN or in-memory SORT
+#   python manage.py rebuild-tag-stats recount the per-tag post counts behind GET /posts/tags
+#   python manage.py reseed-post-count set the feed's post counter (POST_COUNT_STRATEGY=counter)
+#   python manage.py migrate-likes     move legacy PostMessage.likes arrays into the likes collection
+#   python manage.py flush-likes       apply pending like events to likeCount (LIKE_INGEST_MODE=events)
+#   python manage.py migrate-comments  move legacy PostMessage.comments arrays into the comments collection
+
+# Top-level packages that importing the app must not load. Each one is only needed by a
+# single route or not at all, and is imported lazily where it is used.
+DEFERRED_MODULES = [
+    'boto3', 'botocore', 's3transfer', # S3 signed URLs (routes/posts_routes.get_s3_client)
+    'bcrypt',                          # signin/signup (routes/user_routes.get_bcrypt)
+    'dns',                             # mongodb+srv:// resolution, loaded by pymongo on connect
+]
+
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _run_python(code, *flags):
+    return subprocess.run([sys.executable, *flags, '-c', code], capture_output=True, text=True, cwd=REPO_ROOT)
+
+
+def importtime(args):
+    """Prints the slowest imports of `import app`, from python -X importtime."""
+    result = _run_python('import app', '-X', 'importtime')
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        rows.append((int(cumulative_us), int(self_us), name))
+    if not rows:
+        print(result.stderr)
+        return 1
+
+    total_us = sum(self_us for _, self_us, _ in rows)
+    top_level = {}
+    for cumulative_us, self_us, name in rows:
+        package = name.strip().split('.')[0]
+        top_level[package] = top_level.get(package, 0) + self_us
+
+    print(f"import app: {total_us / 1000:.1f} ms across {len(rows)} modules\n")
+    print(f"{'package':<24} {'self ms':>8}")
+    for package, self_us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<24} {self_us / 1000:>8.1f}")
+    print(f"\n{'module':<48} {'cumulative ms':>14}")
+    for cumulative_us, _, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{name.strip():<48} {cumulative_us / 1000:>14.1f}")
+    return 0
+
+
+def startup_import_problems():
+    """What `import app` loads or builds that it should not, in a fresh interpreter.
+    Also run by tests/test_imports.py. Raises RuntimeError if the app does not import at all."""
+    code = (
+        "import json, sys\n"
+        "import app\n"
+        # Flask itself imports jinja2, but the template environment is created on first use
+        "print(json.dumps({'modules': sorted(sys.modules), 'jinja_env': 'jinja_env' in app.app.__dict__}))\n"
+    )
+    result = _run_python(code)
+    if result.returncode != 0:
+        raise RuntimeError(f"import app failed:\n{result.stderr}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    loaded = sorted({m for m in report['modules'] if m.split('.')[0] in DEFERRED_MODULES})
+    problems = [f"imported at startup: {name}" for name in loaded]
+    if report['jinja_env']:
+        problems.append("Flask's Jinja template environment was created at startup")
+    return problems
+
+
+def check_imports(args):
+    """Exits non-zero if importing the app loads a deferred module or builds the Jinja env."""
+    try:
+        problems = startup_import_problems()
+    except RuntimeError as e:
+        print(e)
+        return 1
+    for problem in problems:
+        print(problem)
+    if not problems:
+        print(f"OK: none of {', '.join(DEFERRED_MODULES)} loaded by `import app`")
+    return 1 if problems else 0
+
+
+def build_layer(args):
+    """Builds a pruned, precompiled dependency layer for one Lambda runtime."""
+    from tools.build_layer import build_layer as build
+    return build(
+        requirements=args.requirements,
+        build_dir=args.build_dir,
+        zip_path=args.zip,
+        python_version=args.python_version,
+        platform=args.platform,
+        keep_dist_info=args.keep_dist_info,
+        extra_prune=args.prune,
+    )
+
+
+def native_check(args):
+    """Exits non-zero unless the bson, pymongo and bcrypt C extensions are usable."""
+    from services.native_check import native_extension_report, missing_extensions
+    report = native_extension_report()
+    print(json.dumps(report, indent=2))
+    return 1 if missing_extensions(report) else 0
+
+
+def _connect():
+    # Same client the app uses, configured from CONNECTION_URL and the MONGO_* settings
+    from services.db_connection import db_connection
+    db_connection.ensure()
+
+
+def ensure_indexes(args):
+    """Creates every index declared in the models' meta; safe to re-run."""
+    from tools.indexes import ensure_indexes as ensure
+    _connect()
+    return ensure()
+
+
+def explain_check(args):
+    """Exits non-zero if a route's query plan scans the collection or sorts in memory."""
+    from tools.indexes import explain_check as check
+    _connect()
+    return check(verbose=args.verbose)
+
+
+def rebuild_tag_stats(args):
+    """Recounts the tagstats collection from postmessages, correcting any drift."""
+    from services.tag_stats import rebuild_tag_stats as rebuild
+    _connect()
+    print(f"{rebuild()} tags counted")
+    return 0
+
+
+def reseed_post_count(args):
+    """Sets the post counter behind POST_COUNT_STRATEGY=counter to an exact count."""
+    from services.post_count import reseed_post_counter
+    _connect()
+    print(f"{reseed_post_counter()} posts counted")
+    return 0
+
+
+def migrate_likes(args):
+    """Backfills the likes collection and likeCount from legacy likes arrays; safe to re-run."""
+    from tools.migrate_likes import migrate_likes as migrate
+    _connect()
+    return migrate(batch_size=args.batch_size, recount=args.recount)
+
+
+def flush_likes(args):
+    """Applies queued like events to the posts' likeCount until none are left."""
+    from services import like_ingest
+    _connect()
+    total = 0
+    while True:
+        applied = like_ingest.flush()
+        total += applied
+        if applied < like_ingest.LIKE_FLUSH_BATCH:
+            break
+    print(f"{total} like events applied")
+    return 0
+
+
+def migrate_comments(args):
+    """Backfills the comments collection, commentCount and commentPreview from legacy arrays."""
+    from tools.migrate_comments import migrate_comments as migrate, migrate_threads
+    _connect()
+    if args.threads:
+        return migrate_threads(batch_size=args.batch_size)
+    return migrate(batch_size=args.batch_size, refresh=args.refresh)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memories backend management commands")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    cmd = commands.add_parser('importtime', help=importtime.__doc__)
+    cmd.add_argument('--top', type=int, default=15)
+    cmd.set_defaults(func=importtime)
+
+    cmd = commands.add_parser('check-imports', help=check_imports.__doc__)
+    cmd.set_defaults(func=check_imports)
+
+    from tools.build_layer import DEFAULT_PYTHON_VERSION, DEFAULT_PLATFORM
+    cmd = commands.add_parser('build-layer', help=build_layer.__doc__)
+    cmd.add_argument('--requirements', default='requirements-layer.txt')
+    cmd.add_argument('--build-dir', default='build/layer')
+    cmd.add_argument('--zip', default='build/layer.zip')
+    cmd.add_argument('--python-version', default=DEFAULT_PYTHON_VERSION)
+    cmd.add_argument('--platform', default=DEFAULT_PLATFORM)
+    cmd.add_argument('--keep-dist-info', action='store_true')
+    cmd.add_argument('--prune', nargs='*', default=[], help="extra top-level packages to drop")
+    cmd.set_defaults(func=build_layer)
+
+    cmd = commands.add_parser('native-check', help=native_check.__doc__)
+    cmd.set_defaults(func=native_check)
+
+    cmd = commands.add_parser('ensure-indexes', help=ensure_indexes.__doc__)
+    cmd.set_defaults(func=ensure_indexes)
+
+    cmd = commands.add_parser('explain-check', help=explain_check.__doc__)
+    cmd.add_argument('--verbose', action='store_true', help="print every winning plan")
+    cmd.set_defaults(func=explain_check)
+
+    cmd = commands.add_parser('rebuild-tag-stats', help=rebuild_tag_stats.__doc__)
+    cmd.set_defaults(func=rebuild_tag_stats)
+
+    cmd = commands.add_parser('reseed-post-count', help=reseed_post_count.__doc__)
+    cmd.set_defaults(func=reseed_post_count)
+
+    cmd = commands.add_parser('migrate-likes', help=migrate_likes.__doc__)
+    cmd.add_argument('--batch-size', type=int, default=500)
+    cmd.add_argument('--recount', action='store_true', help="only recompute likeCount for every post")
+    cmd.set_defaults(func=migrate_likes)
+
+    cmd = commands.add_parser('flush-likes', help=flush_likes.__doc__)
+    cmd.set_defaults(func=flush_likes)
+
+    cmd = commands.add_parser('migrate-comments', help=migrate_comments.__doc__)
+    cmd.add_argument('--batch-size', type=int, default=200)
+    cmd.add_argument('--refresh', action='store_true', help="only rebuild commentCount and commentPreview")
+    cmd.add_argument('--threads', action='store_true', help="only add reply-thread fields to older comments")
+    cmd.set_defaults(func=migrate_comments)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+from functools import wraps
+from flask import jsonify
+from services.db_connection import db_connection
+from services.request_logging import logger
+
+# Connects to Mongo only for routes that actually query a model.
+# Stack it under @auth_required so requests without a valid token get their 401
+# before any connection work happens:
+#
+#     @posts_bp.route('/', methods=['POST'])
+#     @auth_required
+#     @db_required
+#     def create_post(current_user_id): ...
+
+def ensure_db():
+    """Returns None once the connection is usable, else an error (payload, status)."""
+    try:
+        db_connection.ensure() # No I/O once the container has a healthy client
+    except Exception as e:
+        logger.exception("db connection failed")
+        return {'message': "Internal Server Error - DB Connection Failed", 'error': str(e)}, 500
+    return None
+
+def db_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        error = ensure_db()
+        if error:
+            payload, status = error
+            return jsonify(payload), status
+        return f(*args, **kwargs)
+    return decorated_function
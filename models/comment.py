@@ -0,0 +1,33 @@
+import datetime
+import mongoengine as me
+
+
+class Comment(me.Document):
+    # One document per comment. The post keeps commentCount and a short preview of its latest
+    # comments (services/post_comments.py); the full list is paged from here.
+    post = me.ObjectIdField(required=True)
+    author = me.StringField() # Commenter's user id; None for comments migrated from the old arrays
+    text = me.StringField(required=True)
+    createdAt = me.DateTimeField(default=lambda: datetime.datetime.now(datetime.timezone.utc))
+    # Reply threads. A reply's rank is its position among its parent's replies (1, 2, ...).
+    #   parent    - the comment replied to; None for a top-level comment
+    #   path      - ranks from the top-level comment down, zero-padded and '/'-joined ('' for the
+    #               top-level comment itself), so sorting a thread by path lists it depth first
+    #   ancestors - {'comment': id, 'maxRank': n} for every comment above this one and itself,
+    #               where maxRank is the largest rank on the way down from that comment. A subtree
+    #               is every comment naming its root here; its first K replies per level are
+    #               those with maxRank <= K
+    parent = me.ObjectIdField()
+    path = me.StringField(default='')
+    depth = me.IntField(default=0)
+    replyCount = me.IntField(default=0)
+    ancestors = me.ListField(me.DictField(), default=[])
+
+    meta = {
+        'collection': 'comments',
+        'auto_create_index': False,
+        'indexes': [
+            ('post', 'parent', '-createdAt', '-id'), # GET /posts/<id>/comments: top-level, newest first, keyset-paged
+            ('ancestors.comment', 'path', 'ancestors.maxRank'), # GET .../comments/<id>/thread, in path order
+        ]
+    }
@@ -0,0 +1,11 @@
+import mongoengine as me
+
+class Counter(me.Document):
+    # One document per counted thing, e.g. _id='postmessages' for the feed's total
+    name = me.StringField(primary_key=True)
+    value = me.IntField(default=0)
+
+    meta = {
+        'collection': 'counters',
+        'auto_create_index': False,
+    }
@@ -0,0 +1,20 @@
+import datetime
+import mongoengine as me
+
+
+class Like(me.Document):
+    # One document per (post, user) like. PostMessage.likeCount is kept in step with it
+    # (services/post_likes.py). Likes are written as upserts on (post, user), so a second like by
+    # the same user is a no-op; the unique index also covers two of them racing.
+    post = me.ObjectIdField(required=True)
+    user = me.StringField(required=True) # Same id string the auth token carries
+    createdAt = me.DateTimeField(default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    meta = {
+        'collection': 'likes',
+        'auto_create_index': False,
+        'indexes': [
+            # Also serves likedByMe: user equality within a page's post $in
+            {'fields': ['post', 'user'], 'unique': True},
+        ]
+    }
@@ -0,0 +1,20 @@
+import datetime
+import mongoengine as me
+
+
+class LikeEvent(me.Document):
+    # A like or unlike whose likeCount update is deferred (LIKE_INGEST_MODE=events, see
+    # services/like_ingest.py). Inserted next to the like itself; deleted once a flush has
+    # recounted the post.
+    post = me.ObjectIdField(required=True)
+    user = me.StringField(required=True)
+    delta = me.IntField(required=True) # +1 like, -1 unlike
+    createdAt = me.DateTimeField(default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    meta = {
+        'collection': 'likeevents',
+        'auto_create_index': False,
+        'indexes': [
+            ('user', 'post'), # The caller's own pending changes for a page (read-your-own-like)
+        ]
+    }
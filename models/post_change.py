@@ -0,0 +1,22 @@
+import datetime
+import mongoengine as me
+
+CHANGE_LOG_TTL_SECONDS = 7 * 24 * 3600
+
+
+class PostChange(me.Document):
+    # One entry per create/update/delete of a PostMessage, read by the in-process search index
+    # (services/bm25_index.py) to catch up on writes. Entries only name the post; readers load
+    # its current state, so applying an entry twice is harmless.
+    post = me.ObjectIdField(required=True)
+    op = me.StringField(required=True, choices=('create', 'update', 'delete'))
+    createdAt = me.DateTimeField(default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    meta = {
+        'collection': 'postchanges',
+        'auto_create_index': False,
+        'indexes': [
+            # Readers page on _id; old entries expire. An index older than the TTL rebuilds.
+            {'fields': ['createdAt'], 'expireAfterSeconds': CHANGE_LOG_TTL_SECONDS},
+        ]
+    }
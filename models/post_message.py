@@ -8,23 +8,43 @@ class PostMessage(me.Document):
     creator = me.ReferenceField('User', required=True) # Changed to ReferenceField
     tags = me.ListField(me.StringField())
     selectedFile = me.StringField() # Will store S3 key or path
-    likes = me.ListField(me.StringField(), default=[]) # List of user IDs who liked
-    # comments = me.ListField(me.StringField(), default=[]) # For future use
+    # Likes live in their own collection (models/like.py); this is their count, kept with $inc.
+    # Posts from before `python manage.py migrate-likes` may still carry a raw `likes` array.
+    likeCount = me.IntField(default=0)
+    # Comments live in their own collection (models/comment.py). The post keeps their count and
+    # its latest COMMENT_PREVIEW_SIZE comments, so a feed page needs no second query for them.
+    # Posts from before `python manage.py migrate-comments` may still carry a raw `comments` array.
+    commentCount = me.IntField(default=0)
+    commentPreview = me.ListField(me.DictField(), default=[])
     createdAt = me.DateTimeField(default=lambda: datetime.datetime.now(datetime.timezone.utc)) # Timezone-aware UTC
 
     # Meta information for MongoEngine, like the collection name
     meta = {
         'collection': 'postmessages', # Explicitly set collection name
         'strict': False, # Allow fields not defined in schema (like _id -> id)
-        'ordering': ['-createdAt'] # Default sort order
+        'ordering': ['-createdAt'], # Default sort order
+        # Built by `python manage.py ensure-indexes`, never on a request (auto_create_index)
+        'auto_create_index': False,
+        'indexes': [
+            ('-createdAt', '-id'),         # Keyset (cursor) pagination of the feed
+            ('tags', '-createdAt', '-id'), # Search by tags, newest first, keyset-paged
+            ('creator', '-createdAt'),     # A user's own posts
+            'title',                       # Title search; an unanchored regex still walks the whole index
+            {                              # SEARCH_MODE=text (services/search.py)
+                'fields': ['$title', '$message', '$tags'],
+                'weights': {'title': 10, 'tags': 5, 'message': 1},
+                'default_language': 'english',
+                'name': 'post_text',
+            },
+        ]
     }
 
     def to_json_serializable(self):
         post_dict = self.to_mongo().to_dict()
         if '_id' in post_dict:
             post_dict['id'] = str(post_dict.pop('_id'))
-        if 'creator' in post_dict and hasattr(self.creator, 'id'): # Ensure creator is populated
-            post_dict['creator'] = str(self.creator.id)
+        if 'creator' in post_dict: # to_mongo() gives the id; reading self.creator would load the User
+            post_dict['creator'] = str(post_dict['creator'])
         
         # Ensure datetime fields are in ISO format and explicitly UTC
         if 'createdAt' in post_dict and isinstance(post_dict['createdAt'], datetime.datetime):
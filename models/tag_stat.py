@@ -0,0 +1,16 @@
+import mongoengine as me
+
+
+class TagStat(me.Document):
+    # One document per tag: how many posts carry it. The post routes keep it in step with $inc
+    # (services/tag_stats.py); `python manage.py rebuild-tag-stats` recounts it from postmessages.
+    tag = me.StringField(primary_key=True)
+    count = me.IntField(default=0)
+
+    meta = {
+        'collection': 'tagstats',
+        'auto_create_index': False,
+        'indexes': [
+            ('-count', '-id'), # GET /posts/tags: most used first
+        ]
+    }
@@ -14,5 +14,6 @@ class User(Document):
     # We will omit adding an explicit 'id' field here unless it served a distinct purpose.
 
     meta = {
-        'collection': 'users' # Mongoose default collection name for model 'User'
+        'collection': 'users', # Mongoose default collection name for model 'User'
+        'auto_create_index': False, # The unique email index comes from `python manage.py ensure-indexes`
     } 
\ No newline at end of file
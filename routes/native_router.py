@@ -0,0 +1,182 @@
+import base64
+import json
+import os
+import re
+from urllib.parse import parse_qsl, unquote
+from werkzeug.datastructures import MultiDict
+from middleware.auth_middleware import authenticate, optional_user
+from middleware.db_middleware import ensure_db
+from routes import posts_routes, user_routes
+from services.request_logging import logger
+
+# Fast path for API Gateway proxy events (REST API payload v1 and HTTP API payload v2).
+# Instead of building a WSGI environ and running Flask's full request stack through
+# serverless_wsgi, dispatch() matches the path against the table below, runs the same
+# auth/DB checks as the decorators, calls the route's handle_* function and builds the
+# API Gateway response dict itself. Anything it does not recognise (OPTIONS preflights,
+# GET /, unknown paths) returns None and goes through Flask as before.
+# Enabled with NATIVE_ROUTER=1; Flask stays the fallback and the local development server.
+# Each route in posts_routes/user_routes is a handle_* function returning (payload, status)
+# plus a thin Flask view; keep request access (request.args, request.get_json()) in the
+# views, so the handlers can be called from here as well.
+
+API_GATEWAY_BASE_PATH = os.getenv("API_GATEWAY_BASE_PATH") # Custom-domain base path, as in serverless_wsgi
+
+
+class NativeRequest:
+    def __init__(self, method, path, args, headers, body):
+        self.method = method
+        self.path = path
+        self.args = args
+        self.headers = headers # Lower-cased names
+        self.body = body
+        self.params = {}
+        self.current_user_id = None
+
+    def optional_user_id(self):
+        # Public routes that personalize the response (likedByMe), like @auth_optional
+        return optional_user(self.headers.get('authorization'))
+
+    def get_json(self):
+        if not self.body:
+            return None
+        return json.loads(self.body)
+
+
+# (method, path pattern, needs auth, needs DB, call)
+_ID = r'(?P<id>[^/]+)'
+ROUTES = [
+    ('GET', r'/posts', False, True, lambda r: posts_routes.handle_get_posts(r.args, r.optional_user_id())),
+    ('GET', r'/posts/search', False, True,
+        lambda r: posts_routes.handle_search_posts(r.args, r.optional_user_id())),
+    ('GET', r'/posts/suggest', False, True, lambda r: posts_routes.handle_suggest(r.args)),
+    ('GET', r'/posts/tags', False, True, lambda r: posts_routes.handle_get_tags(r.args)),
+    ('GET', r'/posts/signed-url/upload', True, False,
+        lambda r: posts_routes.handle_signed_url_for_upload(r.current_user_id, r.args)),
+    ('GET', rf'/posts/{_ID}', False, True,
+        lambda r: posts_routes.handle_get_post(r.params['id'], r.optional_user_id())),
+    ('POST', r'/posts', True, True, lambda r: posts_routes.handle_create_post(r.current_user_id, r.get_json())),
+    ('PATCH', rf'/posts/{_ID}', True, True,
+        lambda r: posts_routes.handle_update_post(r.current_user_id, r.params['id'], r.get_json())),
+    ('DELETE', rf'/posts/{_ID}', True, True,
+        lambda r: posts_routes.handle_delete_post(r.current_user_id, r.params['id'])),
+    ('PATCH', rf'/posts/{_ID}/likePost', True, True,
+        lambda r: posts_routes.handle_like_post(r.current_user_id, r.params['id'])),
+    ('PUT', rf'/posts/{_ID}/like', True, True,
+        lambda r: posts_routes.handle_set_like(r.current_user_id, r.params['id'], True)),
+    ('DELETE', rf'/posts/{_ID}/like', True, True,
+        lambda r: posts_routes.handle_set_like(r.current_user_id, r.params['id'], False)),
+    ('POST', rf'/posts/{_ID}/commentPost', True, True,
+        lambda r: posts_routes.handle_comment_post(r.current_user_id, r.params['id'], r.get_json())),
+    ('GET', rf'/posts/{_ID}/comments', False, True,
+        lambda r: posts_routes.handle_get_comments(r.params['id'], r.args)),
+    ('GET', rf'/posts/{_ID}/comments/(?P<comment_id>[^/]+)/thread', False, True,
+        lambda r: posts_routes.handle_get_thread(r.params['id'], r.params['comment_id'], r.args)),
+    ('POST', r'/user/signin', False, True, lambda r: user_routes.handle_signin(r.get_json())),
+    ('POST', r'/user/signup', False, True, lambda r: user_routes.handle_signup(r.get_json())),
+]
+# Trailing slashes are optional, like app.url_map.strict_slashes = False
+_COMPILED_ROUTES = [
+    (method, re.compile(f"^{pattern}/?$"), needs_auth, needs_db, call)
+    for method, pattern, needs_auth, needs_db, call in ROUTES
+]
+
+
+def _strip_base_path(path):
+    if API_GATEWAY_BASE_PATH:
+        prefix = "/" + API_GATEWAY_BASE_PATH
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+    return unquote(path.split('?', 1)[0])
+
+
+def _body_text(event):
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode('utf-8')
+    return body
+
+
+def parse_event(event):
+    """Builds a NativeRequest from a v1 or v2 proxy event, or None for other event shapes."""
+    if event.get('version') == '2.0':
+        method = event.get('requestContext', {}).get('http', {}).get('method', '')
+        path = event.get('rawPath', '')
+        args = MultiDict(parse_qsl(event.get('rawQueryString', ''), keep_blank_values=True))
+        headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    elif 'httpMethod' in event:
+        method = event['httpMethod']
+        path = event.get('path', '')
+        multi_params = event.get('multiValueQueryStringParameters')
+        if multi_params:
+            args = MultiDict([(k, v) for k, values in multi_params.items() for v in values])
+        else:
+            args = MultiDict(event.get('queryStringParameters') or {})
+        headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    else:
+        return None
+    return NativeRequest(method.upper(), _strip_base_path(path), args, headers, _body_text(event))
+
+
+def match(req):
+    for method, pattern, needs_auth, needs_db, call in _COMPILED_ROUTES:
+        if method != req.method:
+            continue
+        m = pattern.match(req.path)
+        if m:
+            req.params = m.groupdict()
+            return needs_auth, needs_db, call
+    return None
+
+
+def cors_headers(event):
+    # Same as CORS(app, origins='*'): a request's Origin is echoed back, with Vary: Origin so a
+    # cache in front keeps one response per origin; without an Origin header, '*'
+    origin = next((v for k, v in (event.get('headers') or {}).items() if k.lower() == 'origin'), None)
+    if origin:
+        return {'Access-Control-Allow-Origin': origin, 'Vary': 'Origin'}
+    return {'Access-Control-Allow-Origin': '*'}
+
+
+def build_response(app, event, payload, status):
+    # Same bytes jsonify() produces: the app's JSON provider, compact separators, trailing newline
+    body = app.json.dumps(payload, separators=(',', ':')) + "\n"
+    headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body.encode('utf-8')))}
+    headers.update(cors_headers(event))
+    response = {'statusCode': status, 'body': body, 'isBase64Encoded': False}
+    if event.get('multiValueHeaders'):
+        response['multiValueHeaders'] = {k: [v] for k, v in headers.items()}
+    else:
+        response['headers'] = headers
+    return response
+
+
+def dispatch(app, event):
+    """Handles `event` without Flask's request stack, or returns None to fall back to it."""
+    req = parse_event(event)
+    if req is None:
+        return None
+    route = match(req)
+    if route is None:
+        return None
+    needs_auth, needs_db, call = route
+
+    with app.app_context(): # Handlers log through current_app
+        try:
+            if needs_auth:
+                req.current_user_id, error = authenticate(req.headers.get('authorization'))
+                if error:
+                    return build_response(app, event, *error)
+            if needs_db:
+                error = ensure_db()
+                if error:
+                    return build_response(app, event, *error)
+            try:
+                payload, status = call(req)
+            except json.JSONDecodeError:
+                payload, status = {'message': "Request body must be valid JSON"}, 400
+            return build_response(app, event, payload, status)
+        except Exception as e:
+            # Mirrors handle_global_error in app.py
+            logger.exception("unhandled error in native route")
+            return build_response(app, event, {'message': "Internal Server Error", 'error': str(e)}, 500)
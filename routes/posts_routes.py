@@ -1,12 +1,29 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, current_app
 from models.post_message import PostMessage # Changed to direct import
-from middleware.auth_middleware import auth_required # Changed to direct import
+from middleware.auth_middleware import auth_required, auth_optional # Changed to direct import
+from middleware.db_middleware import db_required
+from routes.responses import json_response
+from services.pagination import clamp_limit, keyset_page, InvalidCursor
+from services.post_count import note_post_created, note_post_deleted
+from services.feed_query import fetch_feed_page
+from services.post_reader import list_queryset, search_queryset, find_post
+from services.post_writer import NotPostCreator, PostNotFound, modify_post, post_update, remove_post
+from services.post_serializer import serialize_post
+from services.request_logging import logger
+from services.search import SEARCH_LIMIT, SEARCH_MAX_LIMIT, use_bm25_search, use_text_search, text_search_page
+from services.bm25_index import bm25_search_page
+from services.change_log import record_post_change
+from services.post_likes import toggle_like, set_like, delete_post_likes, mark_liked_by_me
+from services.post_comments import (
+    COMMENTS_LIMIT, COMMENTS_MAX_LIMIT, THREAD_LIMIT, THREAD_MAX_LIMIT, ParentNotFound, ThreadTooDeep, add_comment,
+    comments_page, delete_post_comments, thread_page,
+)
+from services.suggest_index import SUGGEST_ENABLED, SUGGEST_LIMIT, SUGGEST_MAX_LIMIT, get_suggest_index
+from services.tag_stats import TAGS_LIMIT, TAGS_MAX_LIMIT, note_tags_changed, popular_tags, tag_counts
 import math
-from mongoengine.queryset.visitor import Q
-import datetime # Ensure datetime is imported for createdAt
+from bson.errors import InvalidId
 import traceback # Add this import
 import mongoengine
-import boto3 # Add boto3 for S3
 import uuid    # Add uuid for unique filenames
 import os      # Add os to access environment variables
 
@@ -17,158 +34,177 @@ posts_bp = Blueprint(
     url_prefix='/posts' # All routes in this blueprint will be prefixed with /posts
 )
 
-@posts_bp.route('/', methods=['GET'])
-def get_posts():
-    # Diagnostic log for Lambda's current time
-    lambda_current_utc_time = datetime.datetime.utcnow()
-    print(f"LAMBDA DIAGNOSTIC: Current UTC time according to Lambda is {lambda_current_utc_time.isoformat()}")
+LIMIT = 8 # Posts per feed page
+
+_s3_clients = {} # Per region, reused across warm invocations
 
-    page = request.args.get('page', 1, type=int)
-    LIMIT = 8
+def get_s3_client(region_name):
+    # boto3/botocore are imported here rather than at module level: they are a large part
+    # of the cold-start import time and only the signed-URL route needs them
+    client = _s3_clients.get(region_name)
+    if client is None:
+        import boto3
+        client = boto3.client(
+            's3',
+            region_name=region_name,
+            config=boto3.session.Config(signature_version='s3v4') # Recommended for pre-signed URLs
+        )
+        _s3_clients[region_name] = client
+    return client
+
+def handle_get_posts(args, current_user_id=None):
+    # Cursor mode: ?cursor= (empty for the first page), then ?cursor=<nextCursor>.
+    # Old clients keep using ?page=N, which still goes through skip().
+    cursor = args.get('cursor')
+    page = args.get('page', 1, type=int)
     startIndex = (page - 1) * LIMIT
 
     try:
-        total = PostMessage.objects.count()
-        # MongoEngine uses .order_by('-_id') for descending sort by id
-        posts = PostMessage.objects.order_by('-id').skip(startIndex).limit(LIMIT)
+        next_cursor = None
+        if cursor is not None:
+            posts, next_cursor = keyset_page(list_queryset(), cursor, LIMIT)
+        else:
+            # One $facet round trip or count + find, depending on FEED_QUERY_MODE
+            posts, total = fetch_feed_page(startIndex, LIMIT)
         
-        # Convert MongoEngine documents to JSON serializable format
-        posts_list = []
-        for post in posts:
-            # Assuming PostMessage model has a to_json_serializable method
-            # or you manually construct the dict.
-            # Using the to_json_serializable method from the model:
-            if hasattr(post, 'to_json_serializable') and callable(getattr(post, 'to_json_serializable')):
-                posts_list.append(post.to_json_serializable())
-            else: # Fallback to manual construction if method is missing
-                posts_list.append({
-                    'id': str(post.id),
-                    'title': post.title,
-                    'message': post.message,
-                    'name': post.name,
-                    'creator': post.creator,
-                    'tags': post.tags,
-                    'selectedFile': post.selectedFile,
-                    'likes': post.likes,
-                    'comments': post.comments,
-                    'createdAt': post.createdAt.isoformat() if post.createdAt else None
-                })
-
-        return jsonify({
+        # Raw dicts straight from pymongo; same output as PostMessage.to_json_serializable()
+        posts_list = mark_liked_by_me([serialize_post(post) for post in posts], current_user_id)
+
+        if cursor is not None:
+            return {
+                'data': posts_list,
+                'nextCursor': next_cursor
+            }, 200
+
+        return {
             'data': posts_list,
             'currentPage': page,
             'numberOfPages': math.ceil(total / LIMIT)
-        }), 200
+        }, 200
+    except InvalidCursor as e:
+        return {"message": str(e)}, 400
     except mongoengine.errors.LookUpError as e:
         current_app.logger.error(f"LookUpError in get_posts: {str(e)}")
         current_app.logger.error(traceback.format_exc())
-        return jsonify({"message": f"Field lookup error: {str(e)}"}), 500
+        return {"message": f"Field lookup error: {str(e)}"}, 500
     except Exception as e:
         current_app.logger.error(f"Error in get_posts: {str(e)}")
         current_app.logger.error(traceback.format_exc())
-        return jsonify({"message": "An unexpected error occurred fetching posts."}), 500
+        return {"message": "An unexpected error occurred fetching posts."}, 500
 
-@posts_bp.route('/<string:id>', methods=['GET'])
-def get_post(id):
+@posts_bp.route('/', methods=['GET'])
+@auth_optional
+@db_required
+def get_posts(current_user_id):
+    return json_response(handle_get_posts(request.args, current_user_id))
+
+def handle_get_post(id, current_user_id=None):
     try:
         # MongoEngine's get method raises DoesNotExist or MultipleObjectsReturned
         # if not found or multiple found, respectively.
         # We can also use .objects(id=id).first() which returns None if not found.
-        post = PostMessage.objects(id=id).first()
+        post = find_post(id)
         if post:
-            post_data = {
-                'id': str(post.id),
-                'title': post.title,
-                'message': post.message,
-                'name': post.name,
-                'creator': post.creator,
-                'tags': post.tags,
-                'selectedFile': post.selectedFile,
-                'likes': post.likes,
-                'comments': post.comments,
-                'createdAt': post.createdAt.isoformat()
-            }
-            return jsonify(post_data), 200
+            post_data = mark_liked_by_me([serialize_post(post)], current_user_id)[0]
+            return post_data, 200
         else:
-            return jsonify(message="Post not found"), 404
+            return {'message': "Post not found"}, 404
     except Exception as e:
         # Catching specific exceptions like ValidationError from mongoengine might be better
-        print(f"Error in get_post: {e}")
+        logger.exception("error in get_post")
         if "ValidationError" in str(type(e)): # Basic check for invalid ObjectId format
-             return jsonify(message="Invalid Post ID format"), 400
-        return jsonify(message=str(e)), 500 
+             return {'message': "Invalid Post ID format"}, 400
+        return {'message': str(e)}, 500
 
-@posts_bp.route('/search', methods=['GET'])
-def get_posts_by_search():
-    search_query = request.args.get('searchQuery', '')
-    tags = request.args.get('tags', '') # Comma-separated string
+@posts_bp.route('/<string:id>', methods=['GET'])
+@auth_optional
+@db_required
+def get_post(current_user_id, id):
+    return json_response(handle_get_post(id, current_user_id))
+
+def handle_search_posts(args, current_user_id=None):
+    search_query = args.get('searchQuery', '')
+    tags = args.get('tags', '') # Comma-separated string
 
     try:
-        query_conditions = []
-        if search_query:
-            # MongoEngine query for case-insensitive regex on title
-            query_conditions.append(PostMessage.title.matches(f"(?i){search_query}"))
-        
-        if tags:
-            tags_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
-            if tags_list:
-                # MongoEngine query for tags in list
-                query_conditions.append(PostMessage.tags.in_(tags_list))
-        
-        if not query_conditions:
-            return jsonify(data=[]), 200 # Or perhaps an error/message?
-
-        # MongoEngine uses Q objects for $or, $and logic if not directly chainable
-        # For a simple OR, you can often construct it manually or use Q for clarity
-        # If using Q: from mongoengine.queryset.visitor import Q
-        # posts = PostMessage.objects(Q(title__icontains=search_query) | Q(tags__in=tags_list))
-        # For simplicity here, if only one condition, use it. If both, this requires $or.
-        # A direct $or equivalent in MongoEngine for complex queries can be done via raw query dictionary
-        # or by constructing Q objects.
-
-        # Simplified: if we have search_query OR tags. If both, this finds docs matching EITHER.
-        # For MongoEngine, the .objects() call with multiple keyword arguments implies an AND.
-        # To achieve OR, we need to use Q objects or filter multiple times and combine.
-        # Let's try a more direct translation of the $or logic using MongoEngine's syntax:
-
-        final_query = None
-        if search_query and tags_list:
-            final_query = Q(title__icontains=search_query) | Q(tags__in=tags_list)
-        elif search_query:
-            final_query = Q(title__icontains=search_query)
-        elif tags_list:
-            final_query = Q(tags__in=tags_list)
-        
-        if final_query:
-            posts = PostMessage.objects(final_query)
+        tags_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
+        if not search_query and not tags_list:
+            return {'data': [], 'nextCursor': None}, 200 # Or perhaps an error/message?
+
+        # Always one bounded page: ?limit= (capped by SEARCH_MAX_LIMIT), then ?cursor=<nextCursor>
+        limit = clamp_limit(args.get('limit', type=int), SEARCH_LIMIT, SEARCH_MAX_LIMIT)
+        cursor = args.get('cursor')
+        page = None
+        if use_bm25_search(search_query):
+            # In-process index; None while it is missing or stale, then Mongo answers below
+            page = bm25_search_page(search_query, tags_list, cursor, limit)
+        if page is None and use_text_search(search_query):
+            # SEARCH_MODE=text: best matches first; None without the text index, then regex below
+            page = text_search_page(search_query, tags_list, cursor, limit)
+        if page is not None:
+            posts, next_cursor = page
         else:
-            posts = PostMessage.objects.none() # Returns an empty queryset
-
-        posts_list = []
-        for post in posts:
-            posts_list.append({
-                'id': str(post.id),
-                'title': post.title,
-                'message': post.message,
-                'name': post.name,
-                'creator': post.creator,
-                'tags': post.tags,
-                'selectedFile': post.selectedFile,
-                'likes': post.likes,
-                'comments': post.comments,
-                'createdAt': post.createdAt.isoformat()
-            })
-        return jsonify(data=posts_list), 200
+            # Title substring OR any of the tags (services/post_reader.search_queryset), newest first
+            posts, next_cursor = keyset_page(search_queryset(search_query, tags_list), cursor, limit)
+
+        # Same raw path and response shape as the feed
+        return {
+            'data': mark_liked_by_me([serialize_post(post) for post in posts], current_user_id),
+            'nextCursor': next_cursor
+        }, 200
+    except InvalidCursor as e:
+        return {"message": str(e)}, 400
     except Exception as e:
-        print(f"Error in get_posts_by_search: {e}")
-        return jsonify(message=str(e)), 500 
+        logger.exception("error in search_posts")
+        return {'message': str(e)}, 500
 
-@posts_bp.route('/', methods=['POST'])
-@auth_required
-def create_post(current_user_id): # current_user_id is injected by @auth_required
-    data = request.get_json()
+@posts_bp.route('/search', methods=['GET'])
+@auth_optional
+@db_required
+def get_posts_by_search(current_user_id):
+    return json_response(handle_search_posts(request.args, current_user_id))
+
+def handle_suggest(args):
+    # Autocomplete: ?prefix= is what the user has typed; tags and titles starting with it,
+    # most used first, from the in-memory index in services/suggest_index.py
+    if not SUGGEST_ENABLED:
+        return {'message': "Suggestions are disabled"}, 404
+    prefix = args.get('prefix', '')
+    try:
+        index = get_suggest_index()
+        if index is None: # Too many posts to build the index inside a request
+            return {'message': "Suggestions are unavailable"}, 503
+        return index.suggest(prefix, clamp_limit(args.get('limit', type=int), SUGGEST_LIMIT, SUGGEST_MAX_LIMIT)), 200
+    except Exception as e:
+        logger.exception("error in suggest")
+        return {'message': str(e)}, 500
+
+@posts_bp.route('/suggest', methods=['GET'])
+@db_required
+def get_suggestions():
+    return json_response(handle_suggest(request.args))
+
+def handle_get_tags(args):
+    # ?tags=a,b: counts for those tags; otherwise the ?limit= most used. Either way one
+    # indexed read of the tagstats collection (services/tag_stats.py)
+    tags = args.get('tags', '')
+    try:
+        tags_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
+        if tags_list:
+            return {'data': tag_counts(tags_list)}, 200
+        return {'data': popular_tags(clamp_limit(args.get('limit', type=int), TAGS_LIMIT, TAGS_MAX_LIMIT))}, 200
+    except Exception as e:
+        logger.exception("error in get_tags")
+        return {'message': str(e)}, 500
+
+@posts_bp.route('/tags', methods=['GET'])
+@db_required
+def get_tags():
+    return json_response(handle_get_tags(request.args))
+
+def handle_create_post(current_user_id, data): # current_user_id is from @auth_required
     if not data:
-        return jsonify(message="No input data provided"), 400
+        return {'message': "No input data provided"}, 400
 
     try:
         # Ensure all required fields for PostMessage are present or handled
@@ -179,56 +215,37 @@ def create_post(current_user_id): # current_user_id is injected by @auth_require
             creator=current_user_id, # Set by auth_required decorator
             tags=data.get('tags', []),
             selectedFile=data.get('selectedFile', ''),
-            # likes and comments default to empty lists in the model
+            # likeCount and commentCount default to 0, commentPreview to an empty list, in the model
         )
         new_post.save() # This will also validate based on model definition
+        note_post_created()
+        note_tags_changed([], new_post.tags)
+        record_post_change(new_post.id, 'create')
         
-        # Prepare response data (similar to get_post)
-        post_data = {
-            'id': str(new_post.id),
-            'title': new_post.title,
-            'message': new_post.message,
-            'name': new_post.name,
-            'creator': new_post.creator,
-            'tags': new_post.tags,
-            'selectedFile': new_post.selectedFile,
-            'likes': new_post.likes,
-            'comments': new_post.comments,
-            'createdAt': new_post.createdAt.isoformat()
-        }
-        return jsonify(post_data), 201
+        post_data = serialize_post(new_post)
+        post_data['likedByMe'] = False # Nobody has seen it yet
+        return post_data, 201
     except Exception as e:
         # More specific error handling (e.g., mongoengine.errors.ValidationError)
-        print(f"Error in create_post: {e}")
+        logger.exception("error in create_post")
         # 409 Conflict was used in Node.js, usually for duplicate unique entries.
         # If it's a general validation error, 400 Bad Request might be more appropriate.
         # For now, let's use 400 for general save errors as 409 has specific meaning.
         if "ValidationError" in str(type(e)):
-            return jsonify(message=f"Validation Error: {str(e)}"), 400
-        return jsonify(message=f"Error creating post: {str(e)}"), 500 
+            return {'message': f"Validation Error: {str(e)}"}, 400
+        return {'message': f"Error creating post: {str(e)}"}, 500
 
-@posts_bp.route('/<string:id>', methods=['PATCH'])
+@posts_bp.route('/', methods=['POST'])
 @auth_required
-def update_post(current_user_id, id):
-    data = request.get_json()
+@db_required
+def create_post(current_user_id):
+    return json_response(handle_create_post(current_user_id, request.get_json()))
+
+def handle_update_post(current_user_id, id, data):
     if not data:
-        return jsonify(message="No update data provided"), 400
+        return {'message': "No update data provided"}, 400
 
     try:
-        post = PostMessage.objects(id=id).first()
-        if not post:
-            return jsonify(message="Post not found"), 404
-
-        # Security check: Optionally, ensure the user updating the post is the creator
-        # if post.creator != current_user_id:
-        #     return jsonify(message="User not authorized to update this post"), 403
-
-        # Update fields from data. MongoEngine's .update() or modifying and .save()
-        # For partial updates, .update() is efficient. 
-        # If you need to run pre/post save hooks defined on the model, modify and .save().
-        
-        # Example: post.title = data.get('title', post.title) ... then post.save()
-        # Or using update_one for atomic update:
         update_fields = {}
         if 'title' in data: update_fields['set__title'] = data['title']
         if 'message' in data: update_fields['set__message'] = data['message']
@@ -238,134 +255,189 @@ def update_post(current_user_id, id):
         # Cannot update creator or createdAt typically. Likes/comments handled by separate endpoints.
 
         if not update_fields:
-            return jsonify(message="No valid fields to update provided"), 400
-
-        post.update(**update_fields) # Atomic update
-        post.reload() # Reload to get the updated document for the response
-
-        post_data = {
-            'id': str(post.id),
-            'title': post.title,
-            'message': post.message,
-            'name': post.name,
-            'creator': post.creator,
-            'tags': post.tags,
-            'selectedFile': post.selectedFile,
-            'likes': post.likes,
-            'comments': post.comments,
-            'createdAt': post.createdAt.isoformat()
-        }
-        return jsonify(post_data), 200
+            return {'message': "No valid fields to update provided"}, 400
+        # MongoEngine's update would store a bare string in the tags list field as it is
+        if 'tags' in data and not isinstance(data['tags'], list):
+            return {'message': "Validation Error: tags must be a list"}, 400
+
+        # One find_one_and_update, only matching a post current_user_id created. It returns the
+        # post as it was, whose tags tag_stats needs; with this $set applied on top it is exactly
+        # the stored result, so no reload either.
+        changes = post_update(**update_fields)['$set']
+        post = modify_post(id, {'$set': changes}, creator_id=current_user_id, before=True)
+        if 'tags' in changes:
+            note_tags_changed(post.get('tags') or [], changes['tags'])
+        record_post_change(post['_id'], 'update')
+        post.update(changes)
+
+        post_data = mark_liked_by_me([serialize_post(post)], current_user_id)[0]
+        return post_data, 200
+    except InvalidId:
+        return {'message': "Invalid Post ID format"}, 400
+    except PostNotFound as e:
+        return {'message': str(e)}, 404
+    except NotPostCreator as e:
+        return {'message': str(e)}, 403
     except Exception as e:
-        print(f"Error in update_post: {e}")
-        if "ValidationError" in str(type(e)): # For invalid ID format
-             return jsonify(message="Invalid Post ID format or validation error"), 400
-        return jsonify(message=str(e)), 500 
+        logger.exception("error in update_post")
+        if "ValidationError" in str(type(e)):
+            return {'message': f"Validation Error: {str(e)}"}, 400
+        return {'message': str(e)}, 500
+
+@posts_bp.route('/<string:id>', methods=['PATCH'])
+@auth_required
+@db_required
+def update_post(current_user_id, id):
+    return json_response(handle_update_post(current_user_id, id, request.get_json()))
+
+def handle_delete_post(current_user_id, id):
+    try:
+        # One find_one_and_delete, only matching a post current_user_id created
+        post = remove_post(id, creator_id=current_user_id)
+        note_post_deleted()
+        note_tags_changed(post.get('tags') or [], [])
+        delete_post_likes(post['_id'])
+        delete_post_comments(post['_id'])
+        record_post_change(post['_id'], 'delete')
+        return {'message': "Post Deleted successfully"}, 200
+    except InvalidId:
+        return {'message': "Invalid Post ID format"}, 400
+    except PostNotFound as e:
+        return {'message': str(e)}, 404
+    except NotPostCreator as e:
+        return {'message': str(e)}, 403
+    except Exception as e:
+        logger.exception("error in delete_post")
+        return {'message': str(e)}, 500
 
 @posts_bp.route('/<string:id>', methods=['DELETE'])
 @auth_required
+@db_required
 def delete_post(current_user_id, id):
+    return json_response(handle_delete_post(current_user_id, id))
+
+def handle_like_post(current_user_id, id):
     try:
-        post = PostMessage.objects(id=id).first()
+        # Toggle: a like document inserted or deleted, then likeCount moved by one
+        post, liked = toggle_like(id, current_user_id) # current_user_id is already a string from the decorator
         if not post:
-            return jsonify(message="Post not found"), 404
-
-        # Security check: Optionally, ensure the user deleting the post is the creator
-        # if post.creator != current_user_id:
-        #     return jsonify(message="User not authorized to delete this post"), 403
-
-        post.delete() # MongoEngine's delete method
-        return jsonify(message="Post Deleted successfully"), 200
+            return {'message': "Post not found"}, 404
+        return dict(serialize_post(post), likedByMe=liked), 200
+    except InvalidId:
+        return {'message': "Invalid Post ID format"}, 400
     except Exception as e:
-        print(f"Error in delete_post: {e}")
-        if "ValidationError" in str(type(e)): # For invalid ID format
-             return jsonify(message="Invalid Post ID format"), 400
-        return jsonify(message=str(e)), 500 
+        logger.exception("error in like_post")
+        return {'message': str(e)}, 500
 
 @posts_bp.route('/<string:id>/likePost', methods=['PATCH'])
 @auth_required
+@db_required
 def like_post(current_user_id, id):
+    return json_response(handle_like_post(current_user_id, id))
+
+def handle_set_like(current_user_id, id, liked):
+    # PUT likes, DELETE unlikes; repeating either leaves the same state, unlike the toggle
     try:
-        post = PostMessage.objects(id=id).first()
+        post, liked = set_like(id, current_user_id, liked)
         if not post:
-            return jsonify(message="Post not found"), 404
-
-        # The user ID (current_user_id) is already a string from the decorator
-        if current_user_id in post.likes:
-            # User has liked it, so unlike: remove user_id from likes
-            post.update(pull__likes=current_user_id)
-        else:
-            # User hasn't liked it yet, so like: add user_id to likes
-            post.update(add_to_set__likes=current_user_id) # add_to_set ensures no duplicates
-        
-        post.reload() # Reload to get the updated document
-
-        post_data = {
-            'id': str(post.id),
-            'title': post.title,
-            'message': post.message,
-            'name': post.name,
-            'creator': post.creator,
-            'tags': post.tags,
-            'selectedFile': post.selectedFile,
-            'likes': post.likes,
-            'comments': post.comments,
-            'createdAt': post.createdAt.isoformat()
-        }
-        return jsonify(post_data), 200
+            return {'message': "Post not found"}, 404
+        return dict(serialize_post(post), likedByMe=liked), 200
+    except InvalidId:
+        return {'message': "Invalid Post ID format"}, 400
     except Exception as e:
-        print(f"Error in like_post: {e}")
-        if "ValidationError" in str(type(e)):
-             return jsonify(message="Invalid Post ID format"), 400
-        return jsonify(message=str(e)), 500 
+        logger.exception("error in set_like")
+        return {'message': str(e)}, 500
 
-@posts_bp.route('/<string:id>/commentPost', methods=['POST'])
+@posts_bp.route('/<string:id>/like', methods=['PUT'])
+@auth_required
+@db_required
+def like(current_user_id, id):
+    return json_response(handle_set_like(current_user_id, id, True))
+
+@posts_bp.route('/<string:id>/like', methods=['DELETE'])
 @auth_required
-def comment_post(current_user_id, id): # current_user_id is available if needed
-    data = request.get_json()
-    comment_value = data.get('value')
+@db_required
+def unlike(current_user_id, id):
+    return json_response(handle_set_like(current_user_id, id, False))
+
+def handle_comment_post(current_user_id, id, data): # current_user_id becomes the comment's author
+    comment_value = (data or {}).get('value')
+    parent_id = (data or {}).get('parentId') # Set for a reply to another comment on this post
 
     if not comment_value:
-        return jsonify(message="Comment value cannot be empty"), 400
+        return {'message': "Comment value cannot be empty"}, 400
 
     try:
-        post = PostMessage.objects(id=id).first()
-        if not post:
-            return jsonify(message="Post not found"), 404
-
-        # Add the comment. The original code pushed the raw value.
-        # You might want to store comments as objects with user ID, name, timestamp, etc.
-        # For now, replicating the simple string push.
-        post.update(push__comments=comment_value)
-        post.reload()
-
-        post_data = {
-            'id': str(post.id),
-            'title': post.title,
-            'message': post.message,
-            'name': post.name,
-            'creator': post.creator,
-            'tags': post.tags,
-            'selectedFile': post.selectedFile,
-            'likes': post.likes,
-            'comments': post.comments, # This will now include the new comment
-            'createdAt': post.createdAt.isoformat()
-        }
-        return jsonify(post_data), 200
+        # A comments document, then commentCount and commentPreview on the post, which comes back
+        # from the same find_one_and_update
+        post = add_comment(id, current_user_id, comment_value, parent_id)
+        post_data = mark_liked_by_me([serialize_post(post)], current_user_id)[0]
+        return post_data, 200
+    except InvalidId:
+        return {'message': "Invalid Post or Comment ID format"}, 400
+    except (PostNotFound, ParentNotFound) as e:
+        return {'message': str(e)}, 404
+    except ThreadTooDeep as e:
+        return {'message': str(e)}, 400
     except Exception as e:
-        print(f"Error in comment_post: {e}")
-        if "ValidationError" in str(type(e)):
-             return jsonify(message="Invalid Post ID format"), 400
-        return jsonify(message=str(e)), 500 
+        logger.exception("error in comment_post")
+        return {'message': str(e)}, 500
 
-@posts_bp.route('/signed-url/upload', methods=['GET'])
-@auth_required # Optional: protect this route if needed
-def get_signed_url_for_upload(current_user_id): # current_user_id from @auth_required
-    filename = request.args.get('filename')
-    filetype = request.args.get('filetype')
+@posts_bp.route('/<string:id>/commentPost', methods=['POST'])
+@auth_required
+@db_required
+def comment_post(current_user_id, id):
+    return json_response(handle_comment_post(current_user_id, id, request.get_json()))
+
+def handle_get_comments(id, args):
+    # Top-level comments (replies come from the thread endpoint), newest first: ?limit= (capped by COMMENTS_MAX_LIMIT), then ?cursor=<nextCursor>.
+    # An unknown post id is simply an empty page; no read of the post itself.
+    try:
+        limit = clamp_limit(args.get('limit', type=int), COMMENTS_LIMIT, COMMENTS_MAX_LIMIT)
+        comments, next_cursor = comments_page(id, args.get('cursor'), limit)
+        return {'data': comments, 'nextCursor': next_cursor}, 200
+    except InvalidId:
+        return {'message': "Invalid Post ID format"}, 400
+    except InvalidCursor as e:
+        return {"message": str(e)}, 400
+    except Exception as e:
+        logger.exception("error in get_comments")
+        return {'message': str(e)}, 500
+
+@posts_bp.route('/<string:id>/comments', methods=['GET'])
+@db_required
+def get_comments(id):
+    return json_response(handle_get_comments(id, request.args))
+
+def handle_get_thread(id, comment_id, args):
+    # The comment, then its replies depth first, each reply list oldest first. ?perLevel=K keeps
+    # only the first K replies at every level (replyCount tells what was left out); ?limit= and
+    # ?cursor=<nextCursor> page through long threads.
+    try:
+        per_level = args.get('perLevel', type=int)
+        comments, next_cursor = thread_page(
+            id, comment_id, None if per_level is None else max(0, per_level), args.get('cursor'),
+            clamp_limit(args.get('limit', type=int), THREAD_LIMIT, THREAD_MAX_LIMIT))
+        return {'data': comments, 'nextCursor': next_cursor}, 200
+    except InvalidId:
+        return {'message': "Invalid Post or Comment ID format"}, 400
+    except InvalidCursor as e:
+        return {"message": str(e)}, 400
+    except Exception as e:
+        logger.exception("error in get_thread")
+        return {'message': str(e)}, 500
+
+@posts_bp.route('/<string:id>/comments/<string:comment_id>/thread', methods=['GET'])
+@db_required
+def get_thread(id, comment_id):
+    return json_response(handle_get_thread(id, comment_id, request.args))
+
+def handle_signed_url_for_upload(current_user_id, args): # current_user_id from @auth_required
+    filename = args.get('filename')
+    filetype = args.get('filetype')
 
     if not filename or not filetype:
-        return jsonify({"message": "filename and filetype query parameters are required"}), 400
+        return {"message": "filename and filetype query parameters are required"}, 400
 
     # Retrieve S3 bucket name and region from environment variables
     s3_bucket_name = os.environ.get('S3_BUCKET_NAME')
@@ -373,7 +445,7 @@ def get_signed_url_for_upload(current_user_id): # current_user_id from @auth_req
 
     if not s3_bucket_name or not aws_region_name:
         current_app.logger.error("S3_BUCKET_NAME or AWS_REGION_NAME environment variables not set.")
-        return jsonify({"message": "Server configuration error for S3 uploads."}), 500
+        return {"message": "Server configuration error for S3 uploads."}, 500
 
     # Generate a unique key for the S3 object
     # Example: uploads/user_id/uuid_filename.ext
@@ -381,11 +453,7 @@ def get_signed_url_for_upload(current_user_id): # current_user_id from @auth_req
     file_extension = filename.rsplit('.', 1)[-1] if '.' in filename else ''
     unique_key = f"uploads/{current_user_id}/{uuid.uuid4()}.{file_extension}"
 
-    s3_client = boto3.client(
-        's3',
-        region_name=aws_region_name,
-        config=boto3.session.Config(signature_version='s3v4') # Recommended for pre-signed URLs
-    )
+    s3_client = get_s3_client(aws_region_name)
 
     try:
         presigned_url = s3_client.generate_presigned_url(
@@ -393,8 +461,13 @@ def get_signed_url_for_upload(current_user_id): # current_user_id from @auth_req
             Params={'Bucket': s3_bucket_name, 'Key': unique_key, 'ContentType': filetype},
             ExpiresIn=3600  # URL expiration time in seconds (e.g., 1 hour)
         )
-        return jsonify({'uploadURL': presigned_url, 'key': unique_key}), 200
+        return {'uploadURL': presigned_url, 'key': unique_key}, 200
     except Exception as e:
         current_app.logger.error(f"Error generating S3 pre-signed URL: {str(e)}")
         current_app.logger.error(traceback.format_exc())
-        return jsonify({"message": "Could not generate S3 upload URL."}), 500 
\ No newline at end of file
+        return {"message": "Could not generate S3 upload URL."}, 500
+
+@posts_bp.route('/signed-url/upload', methods=['GET'])
+@auth_required # Optional: protect this route if needed
+def get_signed_url_for_upload(current_user_id):
+    return json_response(handle_signed_url_for_upload(current_user_id, request.args))
@@ -0,0 +1,9 @@
+from flask import jsonify
+
+# Route logic lives in plain handle_* functions that return (payload, status).
+# The Flask views wrap the result with json_response(); routes/native_router.py
+# calls the same handlers straight from API Gateway events.
+
+def json_response(result):
+    payload, status = result
+    return jsonify(payload), status
@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from models.user_model import User # Changed to direct import
-import bcrypt # For password hashing
+from middleware.db_middleware import db_required
+from routes.responses import json_response
+from services.request_logging import logger
 import jwt # PyJWT for generating tokens
 import datetime
 import os
@@ -14,23 +16,27 @@ user_bp = Blueprint(
 
 JWT_SECRET = os.getenv("JWT_SECRET", "test") # Same secret as in auth_middleware
 
-@user_bp.route('/signin', methods=['POST'])
-def signin():
-    data = request.get_json()
+def get_bcrypt():
+    # Deferred so importing the app (every cold start) does not load bcrypt's native
+    # extension; only signin/signup hash passwords
+    import bcrypt # For password hashing
+    return bcrypt
+
+def handle_signin(data):
     email = data.get('email')
     password = data.get('password')
 
     if not email or not password:
-        return jsonify(message="Email and password are required"), 400
+        return {'message': "Email and password are required"}, 400
 
     try:
         existing_user = User.objects(email=email).first()
         if not existing_user:
-            return jsonify(message="User doesn't exist."), 404
+            return {'message': "User doesn't exist."}, 404
 
         # Check password (bcrypt.checkpw needs encoded versions)
-        if not bcrypt.checkpw(password.encode('utf-8'), existing_user.password.encode('utf-8')):
-            return jsonify(message="Invalid credentials."), 400
+        if not get_bcrypt().checkpw(password.encode('utf-8'), existing_user.password.encode('utf-8')):
+            return {'message': "Invalid credentials."}, 400
         
         # Password is correct, generate a token
         token_payload = {
@@ -46,15 +52,18 @@ def signin():
             'email': existing_user.email,
             'name': existing_user.name
         }
-        return jsonify(result=user_data, token=token), 200
+        return {'result': user_data, 'token': token}, 200
 
-    except Exception as e:
-        print(f"Error in signin: {e}")
-        return jsonify(message="Something went wrong during sign-in."), 500
+    except Exception:
+        logger.exception("error in signin")
+        return {'message': "Something went wrong during sign-in."}, 500
 
-@user_bp.route('/signup', methods=['POST'])
-def signup():
-    data = request.get_json()
+@user_bp.route('/signin', methods=['POST'])
+@db_required
+def signin():
+    return json_response(handle_signin(request.get_json()))
+
+def handle_signup(data):
     email = data.get('email')
     password = data.get('password')
     confirm_password = data.get('confirmPassword')
@@ -62,17 +71,18 @@ def signup():
     last_name = data.get('lastName')
 
     if not all([email, password, confirm_password, first_name, last_name]):
-        return jsonify(message="All fields are required for signup"), 400
+        return {'message': "All fields are required for signup"}, 400
 
     if password != confirm_password:
-        return jsonify(message="Passwords don't match"), 400
+        return {'message': "Passwords don't match"}, 400
 
     try:
         existing_user = User.objects(email=email).first()
         if existing_user:
-            return jsonify(message="User already exists."), 400
+            return {'message': "User already exists."}, 400
 
         # Hash password
+        bcrypt = get_bcrypt()
         hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(12))
         
         new_user = User(
@@ -96,11 +106,16 @@ def signup():
             'email': new_user.email,
             'name': new_user.name
         }
-        return jsonify(result=user_data, token=token), 201 # 201 Created for signup
+        return {'result': user_data, 'token': token}, 201 # 201 Created for signup
 
     except Exception as e:
-        print(f"Error in signup: {e}")
+        logger.exception("error in signup")
         # Could be mongoengine.errors.NotUniqueError if email unique constraint is violated at DB level despite check
         if "NotUniqueError" in str(type(e)) or (hasattr(e, 'message') and "User already exists" in str(e.message)):
-             return jsonify(message="User already exists."), 400
-        return jsonify(message="Something went wrong during sign-up."), 500 
\ No newline at end of file
+             return {'message': "User already exists."}, 400
+        return {'message': "Something went wrong during sign-up."}, 500
+
+@user_bp.route('/signup', methods=['POST'])
+@db_required
+def signup():
+    return json_response(handle_signup(request.get_json()))
@@ -0,0 +1,20 @@
+import time
+
+# Per-container pause for work that would only fail the same way if retried right away:
+# rebuilding an in-process index (services/bm25_index.py, services/suggest_index.py) whose fresh
+# build could not catch up with the change log, or a $text search on a collection without its
+# text index (services/search.py). While a Backoff is active its owner takes the fallback path
+# instead of repeating the work on every request.
+REBUILD_BACKOFF_SECONDS = 60
+
+
+class Backoff:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.until = 0.0
+
+    def start(self):
+        self.until = time.monotonic() + self.seconds
+
+    def active(self):
+        return time.monotonic() < self.until
@@ -0,0 +1,329 @@
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import time
+from array import array
+from bson import ObjectId
+from models.post_change import CHANGE_LOG_TTL_SECONDS
+from models.post_message import PostMessage
+from services import change_log
+from services.backoff import REBUILD_BACKOFF_SECONDS, Backoff
+from services.pagination import pack_cursor
+from services.post_reader import POST_LIST_PROJECTION
+from services.request_logging import logger
+from services.search import SEARCH_MODE, decode_score_cursor, text_terms
+
+# SEARCH_MODE=bm25: an in-process BM25 inverted index over post titles, messages and tags.
+#   base  - built from one scan of postmessages, written to BM25_INDEX_PATH and memory-mapped
+#           back, so posting lists stay off the Python heap. /tmp outlives the process across
+#           warm invocations and runtime restarts within a container.
+#   delta - posts created, updated or deleted since the base, caught up from the change log
+#           (services/change_log.py) at most every BM25_SYNC_SECONDS and held in memory.
+#           Base entries for changed posts are tombstoned.
+# The index only ranks post ids; the rows for a page still come from one _id $in query.
+# bm25_search_page() returns None when the index is missing or stale and cannot be rebuilt
+# here (collection over BM25_BUILD_MAX_DOCS, too many pending changes, any error), and the
+# caller answers from Mongo instead. Writes show up in results within BM25_SYNC_SECONDS.
+#
+# File layout (native byte order, recorded in the header):
+#   MAGIC | uint32 header length | JSON header | padding to 4 bytes
+#   doc ids (12 bytes each) | doc lengths (uint32) | posting doc numbers (uint32) | posting tfs (uint16)
+# header['terms'] maps each term to [start, count] in the posting arrays.
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "/tmp/memories-bm25.idx")
+BM25_SYNC_SECONDS = float(os.getenv("BM25_SYNC_SECONDS", "2"))
+BM25_BUILD_MAX_DOCS = int(os.getenv("BM25_BUILD_MAX_DOCS", "100000"))
+BM25_MAX_PENDING = int(os.getenv("BM25_MAX_PENDING", "1000")) # Change-log entries per sync
+BM25_MAX_DELTA = int(os.getenv("BM25_MAX_DELTA", "5000")) # Changed posts before a rebuild
+
+MAGIC = b'MEMBM25\x01'
+FIELD_WEIGHTS = {'title': 3, 'tags': 2, 'message': 1}
+TEXT_PROJECTION = {field: 1 for field in FIELD_WEIGHTS}
+K1 = 1.2
+B = 0.75
+MAX_TF = 0xFFFF
+# Keep a margin so a base file is rebuilt before the log entries it still needs expire
+MAX_BASE_AGE_SECONDS = CHANGE_LOG_TTL_SECONDS - 3600
+
+if SEARCH_MODE == 'bm25':
+    change_log.register_reader('bm25')
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def document_terms(row):
+    """(term -> field-weighted frequency, weighted length) for one post row."""
+    tf = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        value = row.get(field)
+        for text in (value if isinstance(value, list) else [value]):
+            if isinstance(text, str):
+                for token in tokenize(text):
+                    tf[token] = tf.get(token, 0) + weight
+    return tf, sum(tf.values())
+
+
+def build_index_file(path, rows, watermark, applied=()):
+    """Writes a base index for `rows` (dicts with _id, title, message, tags); returns the doc count."""
+    doc_ids = bytearray()
+    doc_lens = array('I')
+    postings = {}
+    for number, row in enumerate(rows):
+        tf, length = document_terms(row)
+        doc_ids += row['_id'].binary
+        doc_lens.append(length)
+        for term, freq in tf.items():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = (array('I'), array('H'))
+            entry[0].append(number)
+            entry[1].append(min(freq, MAX_TF))
+
+    post_docs = array('I')
+    post_tfs = array('H')
+    terms = {}
+    for term in sorted(postings):
+        docs, tfs = postings[term]
+        terms[term] = [len(post_docs), len(docs)]
+        post_docs.extend(docs)
+        post_tfs.extend(tfs)
+
+    header = json.dumps({
+        'byteorder': sys.byteorder,
+        'builtAt': time.time(),
+        'watermark': str(watermark) if watermark else None,
+        'applied': [str(change_id) for change_id in applied], # Change-log entries the rows reflect
+        'docs': len(doc_lens),
+        'totalLength': sum(doc_lens),
+        'postings': len(post_docs),
+        'terms': terms,
+    }, separators=(',', ':')).encode('utf-8')
+    prefix = len(MAGIC) + 4 + len(header)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, sys.byteorder))
+        f.write(header)
+        f.write(b'\0' * (-prefix % 4))
+        f.write(doc_ids)
+        doc_lens.tofile(f)
+        post_docs.tofile(f)
+        post_tfs.tofile(f)
+    os.replace(tmp_path, path) # Readers see either the old file or the complete new one
+    return len(doc_lens)
+
+
+class Bm25Index:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a search index file")
+        header_len = int.from_bytes(self._mmap[len(MAGIC):len(MAGIC) + 4], sys.byteorder)
+        start = len(MAGIC) + 4
+        header = json.loads(self._mmap[start:start + header_len])
+        if header['byteorder'] != sys.byteorder:
+            self._mmap.close()
+            raise ValueError(f"{path} was built on a {header['byteorder']}-endian machine")
+
+        offset = start + header_len
+        offset += -offset % 4
+        docs, postings = header['docs'], header['postings']
+        view = memoryview(self._mmap)
+        self._views = [view]
+        def section(size, fmt=None):
+            nonlocal offset
+            part = view[offset:offset + size]
+            offset += size
+            part = part.cast(fmt) if fmt else part
+            self._views.append(part)
+            return part
+        self.doc_ids = section(docs * 12)
+        self.doc_lens = section(docs * 4, 'I')
+        self.post_docs = section(postings * 4, 'I')
+        self.post_tfs = section(postings * 2, 'H')
+
+        self.terms = header['terms']
+        self.built_at = header['builtAt']
+        self.base_docs = docs
+        self.total_length = header['totalLength']
+        self.changes = change_log.ChangeFollower(ObjectId(header['watermark']) if header['watermark'] else None,
+                                                 [ObjectId(change_id) for change_id in header.get('applied', [])])
+        self.tombstones = set() # base doc numbers superseded by the delta or deleted
+        self.delta = {}        # ObjectId bytes -> (term frequencies, length)
+        self._numbers = None   # ObjectId bytes -> base doc number, built on first change
+        self.synced_at = None
+
+    def close(self):
+        for part in reversed(self._views):
+            part.release()
+        self._mmap.close()
+
+    def is_fresh(self):
+        return time.time() - self.built_at < MAX_BASE_AGE_SECONDS
+
+    def _base_number(self, key):
+        if self._numbers is None:
+            ids = self.doc_ids.tobytes()
+            self._numbers = {ids[i * 12:(i + 1) * 12]: i for i in range(self.base_docs)}
+        return self._numbers.get(key)
+
+    def apply(self, post_ids):
+        """Re-reads these posts and replaces whatever the index held for them."""
+        post_ids = list(set(post_ids))
+        rows = {row['_id']: row for row in
+                PostMessage._get_collection().find({'_id': {'$in': post_ids}}, TEXT_PROJECTION)}
+        for post_id in post_ids:
+            key = post_id.binary
+            number = self._base_number(key)
+            if number is not None and number not in self.tombstones:
+                self.tombstones.add(number)
+                self.total_length -= self.doc_lens[number]
+            previous = self.delta.pop(key, None)
+            if previous is not None:
+                self.total_length -= previous[1]
+            row = rows.get(post_id)
+            if row is not None: # Deleted posts just stay out
+                tf, length = document_terms(row)
+                self.delta[key] = (tf, length)
+                self.total_length += length
+
+    def sync(self):
+        """Catches up on the change log; False when the index is too far behind to keep."""
+        now = time.monotonic()
+        if self.synced_at is not None and now - self.synced_at < BM25_SYNC_SECONDS:
+            return True
+        changes = self.changes.pending(BM25_MAX_PENDING)
+        if changes is None:
+            return False
+        if changes:
+            self.apply([change['post'] for change in changes])
+            self.changes.mark_applied(changes)
+        if len(self.delta) > BM25_MAX_DELTA:
+            return False
+        self.synced_at = now
+        return True
+
+    def search(self, terms, cursor, limit):
+        """Returns (post ids, nextCursor) for one page ranked by BM25 score, then _id, descending."""
+        docs = self.base_docs - len(self.tombstones) + len(self.delta)
+        if docs <= 0 or not terms:
+            return [], None
+        avgdl = max(self.total_length / docs, 1.0)
+        base_scores = {}
+        delta_scores = {}
+        for term in set(terms):
+            entry = self.terms.get(term)
+            base_hits = ()
+            if entry:
+                begin, count = entry
+                base_hits = zip(self.post_docs[begin:begin + count], self.post_tfs[begin:begin + count])
+                if self.tombstones: # Materialized only when needed, so df counts live posts
+                    base_hits = [hit for hit in base_hits if hit[0] not in self.tombstones]
+                else:
+                    base_hits = list(base_hits)
+            delta_hits = [(key, tf[term], length) for key, (tf, length) in self.delta.items() if term in tf]
+            df = len(base_hits) + len(delta_hits)
+            if df == 0:
+                continue
+            idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+            for number, freq in base_hits:
+                norm = K1 * (1 - B + B * self.doc_lens[number] / avgdl)
+                base_scores[number] = base_scores.get(number, 0.0) + idf * freq * (K1 + 1) / (freq + norm)
+            for key, freq, length in delta_hits:
+                norm = K1 * (1 - B + B * length / avgdl)
+                delta_scores[key] = delta_scores.get(key, 0.0) + idf * freq * (K1 + 1) / (freq + norm)
+
+        doc_ids = self.doc_ids
+        candidates = [(score, doc_ids[number * 12:(number + 1) * 12].tobytes()) for number, score in base_scores.items()]
+        candidates += [(score, key) for key, score in delta_scores.items()]
+        if cursor:
+            # Strictly after the last post of the previous page in (score desc, _id desc) order
+            score, post_id = decode_score_cursor(cursor)
+            last_key = post_id.binary
+            candidates = [c for c in candidates if c[0] < score or (c[0] == score and c[1] < last_key)]
+        top = heapq.nlargest(limit + 1, candidates)
+        next_cursor = None
+        if len(top) > limit:
+            score, key = top[limit - 1]
+            next_cursor = pack_cursor([score, str(ObjectId(key))])
+        return [ObjectId(key) for _, key in top[:limit]], next_cursor
+
+
+_index = None
+_rebuild_backoff = Backoff(REBUILD_BACKOFF_SECONDS)
+
+
+def _discard():
+    global _index
+    if _index is not None:
+        _index.close()
+        _index = None
+
+
+def _build():
+    global _index
+    collection = PostMessage._get_collection()
+    if collection.estimated_document_count() > BM25_BUILD_MAX_DOCS:
+        _rebuild_backoff.start()
+        return None
+    t0 = time.perf_counter()
+    watermark, applied = change_log.scan_position() # Taken before the scan; later entries are re-applied
+    docs = build_index_file(BM25_INDEX_PATH, collection.find({}, TEXT_PROJECTION), watermark, applied)
+    _index = Bm25Index(BM25_INDEX_PATH)
+    logger.info("search index built", extra={'docs': docs, 'buildMs': round((time.perf_counter() - t0) * 1000, 1)})
+    if _index.sync():
+        return _index
+    # More writes landed during the scan than one sync applies. Rebuilding on the next request
+    # would scan and rewrite the file per request, so Mongo answers until the backoff ends
+    _discard()
+    _rebuild_backoff.start()
+    logger.warning("search index behind after build", extra={'backoffSeconds': REBUILD_BACKOFF_SECONDS})
+    return None
+
+
+def get_index():
+    """The container's index, caught up with the change log, or None when Mongo has to answer."""
+    global _index
+    if _rebuild_backoff.active():
+        return None # The last build could not be used (too large, or behind at once)
+    if _index is not None:
+        if _index.sync():
+            return _index
+        _discard() # Too far behind: rebuild below
+    elif os.path.exists(BM25_INDEX_PATH):
+        try:
+            index = Bm25Index(BM25_INDEX_PATH)
+        except (OSError, ValueError) as e: # Truncated or foreign file: replace it
+            logger.warning("discarding unreadable search index", extra={'error': str(e)})
+            os.remove(BM25_INDEX_PATH)
+        else:
+            if index.is_fresh() and index.sync():
+                _index = index
+                return _index
+            index.close()
+    return _build()
+
+
+def bm25_search_page(search_query, tags_list, cursor, limit):
+    """(raw rows, nextCursor) ranked by the in-process index, or None to fall back to Mongo."""
+    try:
+        index = get_index()
+    except Exception as e:
+        logger.warning("search index unavailable, using Mongo", extra={'error': str(e)})
+        _discard()
+        return None
+    if index is None:
+        return None
+    post_ids, next_cursor = index.search(tokenize(text_terms(search_query, tags_list)), cursor, limit)
+    rows = {row['_id']: row for row in
+            PostMessage._get_collection().find({'_id': {'$in': post_ids}}, POST_LIST_PROJECTION)}
+    return [rows[post_id] for post_id in post_ids if post_id in rows], next_cursor
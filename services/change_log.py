@@ -0,0 +1,85 @@
+import datetime
+from bson import ObjectId
+from models.post_change import PostChange
+
+# Writes and reads of the PostMessage change log (models/post_change.py).
+# Its readers are the in-process indexes: SEARCH_MODE=bm25 (services/bm25_index.py) and
+# SUGGEST_ENABLED=1 (services/suggest_index.py). Each registers itself here when imported with
+# its setting on (the app imports both through routes/posts_routes.py); with no reader
+# registered, writes skip the extra insert.
+# Entry _ids are client-generated ObjectIds: ordered by second, but not within a second across
+# containers, so readers re-read a short overlap window and skip entries they already applied.
+OVERLAP = datetime.timedelta(seconds=10)
+
+_readers = set()
+
+
+def register_reader(name):
+    _readers.add(name)
+
+
+def change_log_enabled():
+    return bool(_readers)
+
+
+def record_post_change(post_id, op):
+    if not change_log_enabled():
+        return
+    PostChange._get_collection().insert_one({
+        'post': ObjectId(str(post_id)),
+        'op': op,
+        'createdAt': datetime.datetime.now(datetime.timezone.utc),
+    })
+
+
+def changes_after(change_id, limit):
+    """Up to `limit` entries with _id > change_id (all entries when change_id is None), oldest first."""
+    query = {} if change_id is None else {'_id': {'$gt': change_id}}
+    return list(PostChange._get_collection().find(query).sort('_id', 1).limit(limit))
+
+
+def latest_change_id():
+    latest = next(PostChange._get_collection().find({}, {'_id': 1}).sort('_id', -1).limit(1), None)
+    return latest['_id'] if latest else None
+
+
+def scan_position():
+    """(watermark, _ids in its overlap window), taken just before a full scan of postmessages.
+    The scan reflects all of those entries, so a ChangeFollower started from them does not
+    count them as pending."""
+    watermark = latest_change_id()
+    if watermark is None:
+        return None, []
+    since = ObjectId.from_datetime(watermark.generation_time - OVERLAP)
+    return watermark, [row['_id'] for row in PostChange._get_collection().find({'_id': {'$gt': since}}, {'_id': 1})]
+
+
+class ChangeFollower:
+    """A reader's position in the change log: the newest entry it applied (the watermark),
+    plus the entries inside the overlap window so re-reading them is a no-op."""
+    def __init__(self, watermark, applied=()):
+        self.watermark = watermark
+        self.applied = {change_id: change_id.generation_time for change_id in applied} # _id -> its time
+
+    def pending(self, max_pending):
+        """Entries not applied yet, oldest first, or None when more than max_pending are waiting.
+        Entries re-read from the overlap window that were applied already do not count."""
+        since = None
+        if self.watermark is not None:
+            since = ObjectId.from_datetime(self.watermark.generation_time - OVERLAP)
+        # Every applied entry still remembered lies inside the window, so this many rows hold
+        # all of them plus one more new entry than allowed
+        changes = changes_after(since, max_pending + len(self.applied) + 1)
+        changes = [change for change in changes if change['_id'] not in self.applied]
+        if len(changes) > max_pending:
+            return None
+        return changes
+
+    def mark_applied(self, changes):
+        if not changes:
+            return
+        for change in changes:
+            self.applied[change['_id']] = change['_id'].generation_time
+        self.watermark = max([change['_id'] for change in changes] + ([self.watermark] if self.watermark else []))
+        horizon = self.watermark.generation_time - OVERLAP
+        self.applied = {key: at for key, at in self.applied.items() if at >= horizon}
@@ -0,0 +1,125 @@
+import os
+import time
+from mongoengine import connect, disconnect
+from mongoengine.connection import get_connection
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+# One Mongo client per Lambda container.
+# The client is created by the first request that needs it (see middleware/db_middleware.py)
+# and then reused by every warm invocation. ensure() is the per-request entry point: when
+# the connection is healthy it returns without any I/O.
+# Health comes from pymongo's topology events, so losing every server marks the manager
+# as reconnecting without per-request pings. The next ensure() then checks the server.
+
+CONNECTION_URL = os.getenv("CONNECTION_URL")
+
+DISCONNECTED = 'disconnected'
+HEALTHY = 'healthy'
+RECONNECTING = 'reconnecting'
+
+
+def pool_settings_from_env():
+    """MongoClient pool options from the environment. Unset variables keep pymongo's defaults."""
+    settings = {
+        'serverSelectionTimeoutMS': int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000")),
+    }
+    int_options = {
+        'MONGO_MIN_POOL_SIZE': 'minPoolSize',
+        'MONGO_MAX_POOL_SIZE': 'maxPoolSize',
+        'MONGO_MAX_IDLE_TIME_MS': 'maxIdleTimeMS',
+    }
+    for env_name, option in int_options.items():
+        value = os.getenv(env_name)
+        if value:
+            settings[option] = int(value)
+    compressors = os.getenv("MONGO_COMPRESSORS") # e.g. "zstd,snappy,zlib"
+    if compressors:
+        settings['compressors'] = compressors
+    return settings
+
+
+class _TopologyHealthListener(monitoring.TopologyListener):
+    def __init__(self, manager):
+        self.manager = manager
+
+    def opened(self, event):
+        pass
+
+    def closed(self, event):
+        pass
+
+    def description_changed(self, event):
+        description = event.new_description
+        if description.has_known_servers and not description.has_readable_server():
+            self.manager.mark_unhealthy("no readable server in topology")
+
+
+class ConnectionManager:
+    def __init__(self, host, alias='default', **client_settings):
+        self.host = host
+        self.alias = alias
+        self.client_settings = client_settings
+        self.state = DISCONNECTED
+        self.last_error = None
+        self.connects = 0
+        self.ensure_calls = 0
+        self.ensure_seconds = 0.0
+        self.last_ensure_seconds = 0.0
+
+    def connect(self):
+        if not self.host:
+            raise RuntimeError("CONNECTION_URL not found.")
+        disconnect(alias=self.alias) # Drops a previous client, a no-op on the first call
+        connect(
+            host=self.host,
+            alias=self.alias,
+            event_listeners=[_TopologyHealthListener(self)],
+            **self.client_settings
+        )
+        self.connects += 1
+        self.state = HEALTHY
+        self.last_error = None
+
+    def ensure(self):
+        """Makes sure there is a usable client. Near free on warm, healthy invocations."""
+        started = time.perf_counter()
+        try:
+            if self.state == DISCONNECTED:
+                self.connect()
+            elif self.state == RECONNECTING:
+                self._recover()
+        finally:
+            self.last_ensure_seconds = time.perf_counter() - started
+            self.ensure_calls += 1
+            self.ensure_seconds += self.last_ensure_seconds
+
+    def _recover(self):
+        # pymongo reconnects on its own, so a ping is usually enough. The client is only
+        # rebuilt when the ping fails; if that fails too the error reaches the caller.
+        try:
+            get_connection(self.alias).admin.command('ping')
+            self.state = HEALTHY
+            self.last_error = None
+        except PyMongoError as e:
+            self.last_error = str(e)
+            self.connect()
+
+    def mark_unhealthy(self, reason):
+        if self.state == HEALTHY:
+            self.state = RECONNECTING
+            self.last_error = str(reason)
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'connects': self.connects,
+            'ensureCalls': self.ensure_calls,
+            'ensureTotalMs': round(self.ensure_seconds * 1000, 3),
+            'lastEnsureMs': round(self.last_ensure_seconds * 1000, 3),
+            'lastError': self.last_error,
+        }
+
+
+# Module-level, so it lives as long as the container does
+db_connection = ConnectionManager(CONNECTION_URL, **pool_settings_from_env())
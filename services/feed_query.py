@@ -0,0 +1,58 @@
+import os
+from models.post_message import PostMessage
+from services import post_count
+from services.post_reader import POST_LIST_PROJECTION, list_queryset
+from services.request_logging import logger
+
+# Page + total for the legacy ?page=N feed.
+# FEED_QUERY_MODE:
+#   split - the original two round trips: the count from services.post_count, then a find()
+#           (default)
+#   facet - one aggregation round trip: a $facet returns the page and the exact total together.
+#           Its total branch reads every document, so each page costs O(collection). It only
+#           pays off when an exact count is needed anyway (POST_COUNT_STRATEGY=exact, itself a
+#           scan), saving the second round trip
+# With POST_COUNT_STRATEGY set to estimated (the default), cached or counter the total is
+# already cheap, so the split path is used regardless of this switch (with a warning at import).
+# Both paths return projected raw dicts for services.post_serializer.serialize_post().
+FEED_QUERY_MODE = os.getenv("FEED_QUERY_MODE", "split")
+
+if FEED_QUERY_MODE == 'facet' and post_count.POST_COUNT_STRATEGY != 'exact':
+    logger.warning("FEED_QUERY_MODE=facet is ignored unless POST_COUNT_STRATEGY=exact",
+                   extra={'postCountStrategy': post_count.POST_COUNT_STRATEGY})
+
+
+def _split_page(start_index, limit):
+    total = post_count.count_posts()
+    # MongoEngine uses .order_by('-_id') for descending sort by id
+    posts = list(list_queryset().order_by('-id').skip(start_index).limit(limit))
+    return posts, total
+
+
+def facet_pipeline(start_index, limit):
+    # $facet sub-pipelines cannot use indexes, so the sort runs before it, on the _id index
+    return [
+        {'$sort': {'_id': -1}},
+        {'$facet': {
+            'data': [{'$skip': start_index}, {'$limit': limit}, {'$project': POST_LIST_PROJECTION}],
+            'total': [{'$count': 'count'}],
+        }}
+    ]
+
+
+def _facet_page(start_index, limit):
+    pipeline = facet_pipeline(start_index, limit)
+    result = next(PostMessage._get_collection().aggregate(pipeline), None) or {}
+    total_rows = result.get('total') or [{'count': 0}]
+    return result.get('data', []), total_rows[0]['count']
+
+
+def use_facet():
+    return FEED_QUERY_MODE == 'facet' and post_count.POST_COUNT_STRATEGY == 'exact'
+
+
+def fetch_feed_page(start_index, limit):
+    """Returns (raw post dicts, total) for one skip()-paged feed page."""
+    if use_facet():
+        return _facet_page(start_index, limit)
+    return _split_page(start_index, limit)
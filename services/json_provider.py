@@ -0,0 +1,45 @@
+import datetime
+from bson import DBRef, Decimal128, ObjectId
+from flask.json.provider import DefaultJSONProvider
+from mongoengine.base import BaseDocument
+
+# App-wide JSON provider (app.json). Route handlers can return bson values and MongoEngine
+# references as they are; they are encoded here, once, at jsonify()/app.json.dumps() time:
+#   ObjectId -> "hex"    DBRef / referenced Document -> "hex" of its id
+#   datetime -> ISO 8601 in UTC (naive values are taken as UTC)    Decimal128 -> "decimal string"
+# Output options (sorted keys, compact separators) are Flask's defaults, so responses keep
+# the same bytes they had with the stock provider.
+
+
+def _utc_isoformat(dt):
+    # If it's naive, assume it's UTC (our model default is UTC); otherwise convert to UTC
+    if dt.tzinfo is None or dt.tzinfo.utcoffset(dt) is None:
+        return dt.replace(tzinfo=datetime.timezone.utc).isoformat()
+    if dt.tzinfo is not datetime.timezone.utc:
+        dt = dt.astimezone(datetime.timezone.utc)
+    return dt.isoformat()
+
+
+# Exact-type lookup first; the json C encoder calls default() once per value it cannot encode
+_ENCODERS = {
+    ObjectId: str,
+    DBRef: lambda ref: str(ref.id),
+    datetime.datetime: _utc_isoformat,
+    Decimal128: lambda value: str(value.to_decimal()),
+}
+
+
+def encode_bson(o):
+    encoder = _ENCODERS.get(type(o))
+    if encoder is not None:
+        return encoder(o)
+    if isinstance(o, BaseDocument): # A dereferenced ReferenceField, e.g. post.creator
+        return str(o.pk)
+    for kind, encoder in _ENCODERS.items(): # Subclasses, e.g. a tz-aware datetime type
+        if isinstance(o, kind):
+            return encoder(o)
+    return DefaultJSONProvider.default(o)
+
+
+class MemoriesJSONProvider(DefaultJSONProvider):
+    default = staticmethod(encode_bson)
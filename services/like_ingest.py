@@ -0,0 +1,142 @@
+import atexit
+import datetime
+import os
+import threading
+import time
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from models.counter import Counter
+from models.like import Like
+from models.like_event import LikeEvent
+from models.post_message import PostMessage
+
+# How a like reaches PostMessage.likeCount. The like document itself (models/like.py) is always
+# written on the request, so likedByMe is exact in every mode.
+# LIKE_INGEST_MODE:
+#   direct - $inc likeCount on the request (default). Every like on a trending post queues on
+#            that one document's write lock.
+#   events - append a LikeEvent instead; a flush recounts the touched posts from the likes
+#            collection and writes all their counts in one bulk_write, then deletes the events.
+#            Any container may flush: like requests start one every LIKE_FLUSH_SECONDS under a
+#            lease in 'counters', and `python manage.py flush-likes` can run on a schedule.
+#   buffer - the same, with the pending changes held in this process instead of a collection.
+#            For a long-running server only: a Lambda container can be frozen or dropped with a
+#            buffer that nothing else will flush.
+# Flushes recount rather than add deltas, so a flush that is repeated, overlaps another or dies
+# halfway never makes a count drift; the next one corrects it.
+# Consistency bounds in events/buffer mode:
+#   - likeCount seen by others lags by at most LIKE_FLUSH_SECONDS plus one flush, as long as
+#     likes keep arriving or flush-likes runs (a quiet post waits for the next trigger)
+#   - the caller sees their own change at once: responses add their pending events to
+#     likeCount (own_pending). Around a flush that overlay can be off by one for the caller,
+#     until the next flush
+#   - buffer mode loses unflushed changes if the process dies; counts stay stale until that post
+#     is liked again or `python manage.py migrate-likes --recount` runs
+LIKE_INGEST_MODE = os.getenv("LIKE_INGEST_MODE", "direct")
+LIKE_FLUSH_SECONDS = float(os.getenv("LIKE_FLUSH_SECONDS", "5"))
+LIKE_FLUSH_BATCH = int(os.getenv("LIKE_FLUSH_BATCH", "5000")) # Events per flush
+LEASE_SECONDS = 30
+LEASE_NAME = 'like-flush' # Counter document whose value is the lease's expiry (epoch seconds)
+
+_buffer = [] # buffer mode: (post, user, delta) not flushed yet
+_buffer_lock = threading.Lock()
+_next_flush = 0.0
+
+
+def deferred():
+    return LIKE_INGEST_MODE in ('events', 'buffer')
+
+
+def record(post_id, user_id, delta):
+    if LIKE_INGEST_MODE == 'buffer':
+        with _buffer_lock:
+            _buffer.append((post_id, user_id, delta))
+    else:
+        LikeEvent._get_collection().insert_one({
+            'post': post_id,
+            'user': user_id,
+            'delta': delta,
+            'createdAt': datetime.datetime.now(datetime.timezone.utc),
+        })
+
+
+def own_pending(user_id, post_ids):
+    """{post id: net change} the caller made that likeCount does not include yet."""
+    pending = {}
+    if LIKE_INGEST_MODE == 'buffer':
+        wanted = set(post_ids)
+        with _buffer_lock:
+            changes = [(post, delta) for post, user, delta in _buffer if user == user_id and post in wanted]
+    else:
+        changes = [(doc['post'], doc['delta']) for doc in LikeEvent._get_collection().find(
+            {'user': user_id, 'post': {'$in': list(post_ids)}}, {'post': 1, 'delta': 1, '_id': 0})]
+    for post, delta in changes:
+        pending[post] = pending.get(post, 0) + delta
+    return pending
+
+
+def recount(post_ids):
+    """Sets likeCount from the likes collection for these posts: one aggregate, one bulk_write."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    counts = {row['_id']: row['count'] for row in Like._get_collection().aggregate([
+        {'$match': {'post': {'$in': post_ids}}}, # Walks the (post, user) index
+        {'$group': {'_id': '$post', 'count': {'$sum': 1}}},
+    ])}
+    ops = [UpdateOne({'_id': post_id}, {'$set': {'likeCount': counts.get(post_id, 0)}}) for post_id in post_ids]
+    PostMessage._get_collection().bulk_write(ops, ordered=False)
+
+
+def _take_lease():
+    now = int(time.time())
+    try:
+        # Matches only an expired lease; otherwise the upsert collides with the existing document
+        Counter._get_collection().update_one(
+            {'_id': LEASE_NAME, 'value': {'$lt': now}}, {'$set': {'value': now + LEASE_SECONDS}}, upsert=True)
+        return True
+    except DuplicateKeyError: # Someone else holds the lease and is flushing
+        return False
+
+
+def _release_lease():
+    Counter._get_collection().update_one({'_id': LEASE_NAME}, {'$set': {'value': 0}})
+
+
+def flush():
+    """Applies pending like changes to likeCount; returns the number of changes applied."""
+    if LIKE_INGEST_MODE == 'buffer':
+        with _buffer_lock:
+            changes = _buffer[:LIKE_FLUSH_BATCH]
+            del _buffer[:LIKE_FLUSH_BATCH]
+        recount({post for post, _, _ in changes})
+        return len(changes)
+    if not _take_lease():
+        return 0
+    try:
+        events = LikeEvent._get_collection()
+        # Read before counting: every event read here has its like in place already
+        batch = list(events.find({}, {'post': 1}).sort('_id', 1).limit(LIKE_FLUSH_BATCH))
+        recount({event['post'] for event in batch})
+        events.delete_many({'_id': {'$in': [event['_id'] for event in batch]}})
+        return len(batch)
+    finally:
+        _release_lease()
+
+
+def maybe_flush():
+    """Called after each deferred like: flushes at most every LIKE_FLUSH_SECONDS per process."""
+    global _next_flush
+    now = time.monotonic()
+    if not deferred() or now < _next_flush:
+        return
+    _next_flush = now + LIKE_FLUSH_SECONDS
+    flush()
+
+
+def _flush_at_exit():
+    if LIKE_INGEST_MODE == 'buffer' and _buffer:
+        flush()
+
+
+atexit.register(_flush_at_exit)
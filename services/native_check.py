@@ -0,0 +1,37 @@
+import glob
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+# Reports whether the C extensions the hot path depends on are usable by this interpreter.
+# bson and pymongo quietly fall back to pure Python when their extension was built for a
+# different CPython ABI (e.g. a cp39 _cbson on the 3.12 runtime), which makes every BSON
+# encode/decode several times slower. bcrypt has no fallback, so a missing build only
+# shows up on the first signin. The check runs once per container and does not import bcrypt.
+
+
+def _extension_present(package, module_prefix):
+    spec = importlib.util.find_spec(package)
+    if spec is None or not spec.submodule_search_locations:
+        return False
+    for location in spec.submodule_search_locations:
+        for suffix in importlib.machinery.EXTENSION_SUFFIXES:
+            if glob.glob(os.path.join(location, module_prefix + suffix)):
+                return True
+    return False
+
+
+def native_extension_report():
+    import bson
+    import pymongo
+    return {
+        'python': f"{sys.version_info.major}.{sys.version_info.minor}",
+        'bson._cbson': bson.has_c(),
+        'pymongo._cmessage': pymongo.has_c(),
+        'bcrypt._bcrypt': _extension_present('bcrypt', '_bcrypt'),
+    }
+
+
+def missing_extensions(report):
+    return [name for name, loaded in report.items() if name != 'python' and not loaded]
@@ -0,0 +1,91 @@
+import base64
+import datetime
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine.queryset.visitor import Q
+
+# Keyset ("cursor") pagination helpers.
+# A cursor is the (createdAt, _id) key of the last post a client has seen, packed into
+# an opaque url-safe string. The next page starts strictly after that key, so Mongo can
+# walk the ('-createdAt', '-_id') index directly instead of skipping over earlier pages.
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def clamp_limit(requested, default, maximum):
+    """Page size for a ?limit= value (None when absent or not a number): `default` when absent,
+    otherwise between 1 and `maximum`."""
+    if requested is None:
+        return min(default, maximum)
+    return max(1, min(requested, maximum))
+
+
+def _to_millis(dt):
+    # BSON dates have millisecond precision, so that is all the cursor needs to carry
+    if dt.tzinfo is None or dt.tzinfo.utcoffset(dt) is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def pack_cursor(values):
+    """Opaque url-safe cursor for a JSON-serializable list of sort key values."""
+    payload = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def unpack_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except ValueError as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    return values
+
+
+def encode_cursor(created_at, post_id):
+    return pack_cursor([_to_millis(created_at), str(post_id)])
+
+
+def decode_cursor(cursor):
+    try:
+        millis, post_id = unpack_cursor(cursor)
+        # Naive UTC datetime, which is what pymongo sends for naive values
+        created_at = datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=int(millis))
+        return created_at, ObjectId(post_id)
+    except (ValueError, TypeError, InvalidId) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def cursor_for(post):
+    if isinstance(post, dict): # Raw rows from an as_pymongo() queryset
+        return encode_cursor(post['createdAt'], post['_id'])
+    return encode_cursor(post.createdAt, post.id)
+
+
+def keyset_filter(cursor):
+    # Everything strictly "older" than the cursor key in ('-createdAt', '-_id') order
+    created_at, post_id = decode_cursor(cursor)
+    return Q(createdAt__lt=created_at) | Q(createdAt=created_at, id__lt=post_id)
+
+
+def keyset_queryset(queryset, cursor, limit):
+    # One page plus one document, walking the ('-createdAt', '-_id') index
+    if cursor:
+        queryset = queryset.filter(keyset_filter(cursor))
+    return queryset.order_by('-createdAt', '-id').limit(limit + 1)
+
+
+def keyset_page(queryset, cursor, limit):
+    """Returns (documents, nextCursor) for one page of `queryset` after `cursor`.
+
+    Fetches one extra document to find out whether another page exists, so the
+    last page comes back with nextCursor=None instead of an empty follow-up page.
+    """
+    docs = list(keyset_queryset(queryset, cursor, limit))
+    next_cursor = cursor_for(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
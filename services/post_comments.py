@@ -0,0 +1,172 @@
+import datetime
+import os
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from models.comment import Comment
+from models.post_message import PostMessage
+from services.pagination import InvalidCursor, keyset_page, pack_cursor, unpack_cursor
+from services.post_writer import PostNotFound, modify_post
+
+# Comments are documents in the comments collection (models/comment.py). Each post carries
+# commentCount and commentPreview, its latest COMMENT_PREVIEW_SIZE comments oldest first, so
+# feed and detail responses show them without reading the collection.
+# Adding a comment is an insert plus one find_one_and_update on the post ($inc, $push with
+# $slice; services/post_writer.modify_post) that also returns the post for the response.
+# refresh_comment_summaries() rebuilds both fields from the collection, for the migration and
+# after a failed write.
+# Replies form threads under a top-level comment (see models/comment.py for path and ancestors).
+# A reply first takes its rank from the parent's replyCount ($inc, which also returns the
+# parent's path and ancestors), then is inserted like any comment. thread_page() reads a whole
+# subtree, or its first ?perLevel= replies per level, as one range of the
+# (ancestors.comment, path, ancestors.maxRank) index, in display order.
+COMMENT_PREVIEW_SIZE = int(os.getenv("COMMENT_PREVIEW_SIZE", "3"))
+COMMENTS_LIMIT = int(os.getenv("COMMENTS_LIMIT", "20"))
+COMMENTS_MAX_LIMIT = int(os.getenv("COMMENTS_MAX_LIMIT", "100"))
+THREAD_LIMIT = int(os.getenv("THREAD_LIMIT", "200"))
+THREAD_MAX_LIMIT = int(os.getenv("THREAD_MAX_LIMIT", "1000"))
+COMMENT_MAX_DEPTH = int(os.getenv("COMMENT_MAX_DEPTH", "32")) # ancestors holds depth + 1 entries
+RANK_WIDTH = 6 # Path segments sort numerically up to 999999 replies to one comment
+
+
+class ParentNotFound(LookupError):
+    pass
+
+
+class ThreadTooDeep(ValueError):
+    pass
+
+
+def preview_entry(comment):
+    """A comment row as it is embedded in commentPreview and returned by the comments endpoint."""
+    return {
+        'id': comment['_id'],
+        'author': comment.get('author'),
+        'text': comment['text'],
+        'createdAt': comment['createdAt'],
+    }
+
+
+def comment_entry(comment):
+    """A comment row as the comments and thread endpoints return it."""
+    entry = preview_entry(comment)
+    entry['parentId'] = comment.get('parent')
+    entry['depth'] = comment.get('depth', 0)
+    entry['replyCount'] = comment.get('replyCount', 0)
+    return entry
+
+
+def thread_fields(comment_id, parent, rank):
+    """parent, path, depth and ancestors of a new comment. `parent` is the parent's row with its
+    rank-taking replyCount already applied, or None for a top-level comment."""
+    if parent is None:
+        return {'parent': None, 'path': '', 'depth': 0, 'replyCount': 0,
+                'ancestors': [{'comment': comment_id, 'maxRank': 0}]}
+    # Comments from before threads are all top-level and may have no thread fields yet
+    ancestors = parent.get('ancestors') or [{'comment': parent['_id'], 'maxRank': 0}]
+    segment = str(rank).zfill(RANK_WIDTH)
+    return {
+        'parent': parent['_id'],
+        'path': f"{parent['path']}/{segment}" if parent.get('path') else segment,
+        'depth': parent.get('depth', 0) + 1,
+        'replyCount': 0,
+        'ancestors': [{'comment': a['comment'], 'maxRank': max(a['maxRank'], rank)} for a in ancestors]
+                     + [{'comment': comment_id, 'maxRank': 0}],
+    }
+
+
+def _take_rank(post_id, parent_id):
+    """The parent's row after taking the next reply rank from its replyCount."""
+    comments = Comment._get_collection()
+    parent = comments.find_one_and_update(
+        # $not rather than $lt: comments from before threads have no depth and are top-level
+        {'_id': ObjectId(parent_id), 'post': post_id, 'depth': {'$not': {'$gte': COMMENT_MAX_DEPTH - 1}}},
+        {'$inc': {'replyCount': 1}},
+        projection={'path': 1, 'depth': 1, 'ancestors': 1, 'replyCount': 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if parent is None:
+        # Only on failure: find out whether the parent is missing or the thread is full
+        if comments.count_documents({'_id': ObjectId(parent_id), 'post': post_id}, limit=1):
+            raise ThreadTooDeep(f"Replies cannot be nested more than {COMMENT_MAX_DEPTH} levels deep")
+        raise ParentNotFound(f"Comment {parent_id} not found on this post")
+    return parent
+
+
+def add_comment(post_id, author, text, parent_id=None):
+    """Returns the updated post row. Raises PostNotFound (and keeps no comment, nor a parent's
+    replyCount change) when there is no such post, bson.errors.InvalidId for ids that are not ObjectIds, and for a reply
+    ParentNotFound or ThreadTooDeep when it cannot go under `parent_id`."""
+    post_id = ObjectId(post_id)
+    comment = {
+        '_id': ObjectId(),
+        'post': post_id,
+        'author': author,
+        'text': text,
+        'createdAt': datetime.datetime.now(datetime.timezone.utc),
+    }
+    if parent_id is None:
+        comment.update(thread_fields(comment['_id'], None, 0))
+    else:
+        parent = _take_rank(post_id, parent_id)
+        comment.update(thread_fields(comment['_id'], parent, parent['replyCount']))
+    Comment._get_collection().insert_one(comment)
+    try:
+        return modify_post(post_id, {
+            '$inc': {'commentCount': 1},
+            '$push': {'commentPreview': {'$each': [preview_entry(comment)], '$slice': -COMMENT_PREVIEW_SIZE}},
+        })
+    except PostNotFound:
+        Comment._get_collection().delete_one({'_id': comment['_id']})
+        if parent_id is not None:
+            # Give back the rank taken above. With the post gone no later reply can be kept,
+            # so the rank cannot end up shared with another reply
+            Comment._get_collection().update_one({'_id': parent['_id']}, {'$inc': {'replyCount': -1}})
+        raise
+
+
+def comments_page(post_id, cursor, limit):
+    """(top-level comments, nextCursor) newest first, one walk of the (post, parent, -createdAt,
+    -_id) index."""
+    queryset = Comment.objects(post=ObjectId(post_id), parent=None).exclude('post', 'ancestors').as_pymongo()
+    rows, next_cursor = keyset_page(queryset, cursor, limit)
+    return [comment_entry(row) for row in rows], next_cursor
+
+
+def thread_queryset(post_id, comment_id, per_level, cursor, limit):
+    """The comment and its replies in path order after `cursor`, one page plus one row. With
+    `per_level`, only the first per_level replies to each comment at every level."""
+    match = {'comment': ObjectId(comment_id)}
+    if per_level is not None:
+        match['maxRank'] = {'$lte': per_level}
+    query = {'ancestors': {'$elemMatch': match}, 'post': ObjectId(post_id)}
+    if cursor:
+        values = unpack_cursor(cursor)
+        if len(values) != 1 or not isinstance(values[0], str):
+            raise InvalidCursor(f"Invalid cursor: {cursor}")
+        query['path'] = {'$gt': values[0]}
+    return Comment.objects(__raw__=query).exclude('post', 'ancestors').order_by('path').limit(limit + 1).as_pymongo()
+
+
+def thread_page(post_id, comment_id, per_level, cursor, limit):
+    """(comments depth first, nextCursor) for the thread under `comment_id`, the comment first."""
+    rows = list(thread_queryset(post_id, comment_id, per_level, cursor, limit))
+    next_cursor = pack_cursor([rows[limit - 1]['path']]) if len(rows) > limit else None
+    return [comment_entry(row) for row in rows[:limit]], next_cursor
+
+
+def delete_post_comments(post_id):
+    Comment._get_collection().delete_many({'post': ObjectId(str(post_id))})
+
+
+def refresh_comment_summaries(post_ids):
+    """Sets commentCount and commentPreview from the comments collection for these posts."""
+    comments = Comment._get_collection()
+    ops = []
+    for post_id in post_ids:
+        latest = list(comments.find({'post': post_id}).sort([('createdAt', -1), ('_id', -1)]).limit(COMMENT_PREVIEW_SIZE))
+        ops.append(UpdateOne({'_id': post_id}, {'$set': {
+            'commentCount': comments.count_documents({'post': post_id}),
+            'commentPreview': [preview_entry(row) for row in reversed(latest)],
+        }}))
+    if ops:
+        PostMessage._get_collection().bulk_write(ops, ordered=False)
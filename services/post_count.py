@@ -0,0 +1,89 @@
+import os
+import time
+from models.post_message import PostMessage
+from models.counter import Counter
+
+# Total post count used for the feed's numberOfPages.
+# POST_COUNT_STRATEGY picks how it is computed:
+#   estimated - estimated_document_count(), read from collection metadata, no scan (default; what
+#               the original PostMessage.objects.count() with no filter already did)
+#   exact     - countDocuments({}) on every call, a scan of the _id index; exact even where the
+#               metadata count is not (after an unclean shutdown, on sharded clusters with orphans)
+#   cached    - exact count, cached per container for POST_COUNT_CACHE_TTL seconds
+#   counter   - a document in 'counters' that create_post/delete_post keep in step with $inc,
+#               exact without a scan; only worth its extra write per create/delete where the
+#               metadata count cannot be trusted. Seed it before switching over with
+#               `python manage.py reseed-post-count`, which also corrects any drift
+# Any other value fails at import.
+POST_COUNT_STRATEGY = os.getenv("POST_COUNT_STRATEGY", "estimated")
+POST_COUNT_CACHE_TTL = float(os.getenv("POST_COUNT_CACHE_TTL", "30"))
+
+COUNTER_NAME = 'postmessages'
+
+_cache = {'value': None, 'expires_at': 0.0}
+
+
+def _exact_count():
+    return PostMessage._get_collection().count_documents({})
+
+
+def _estimated_count():
+    return PostMessage._get_collection().estimated_document_count()
+
+
+def _cached_count():
+    now = time.monotonic()
+    if _cache['value'] is None or now >= _cache['expires_at']:
+        _cache['value'] = _exact_count()
+        _cache['expires_at'] = now + POST_COUNT_CACHE_TTL
+    return _cache['value']
+
+
+def _counter_count():
+    counters = Counter._get_collection()
+    doc = counters.find_one({'_id': COUNTER_NAME})
+    if doc is None:
+        # Not seeded (reseed_post_counter() at deploy): fall back to an exact count rather than
+        # seeding here, where an $inc landing between the count and the insert would be lost
+        return _exact_count()
+    return max(doc.get('value', 0), 0)
+
+
+def reseed_post_counter():
+    """Sets the counter to an exact count of postmessages and returns it. Creates and deletes
+    that land while the count runs can still be missed; re-run it to correct them."""
+    value = _exact_count()
+    Counter._get_collection().update_one({'_id': COUNTER_NAME}, {'$set': {'value': value}}, upsert=True)
+    return value
+
+
+_STRATEGIES = {
+    'exact': _exact_count,
+    'estimated': _estimated_count,
+    'cached': _cached_count,
+    'counter': _counter_count,
+}
+
+if POST_COUNT_STRATEGY not in _STRATEGIES:
+    raise ValueError(f"Unknown POST_COUNT_STRATEGY {POST_COUNT_STRATEGY!r}; expected one of {', '.join(_STRATEGIES)}")
+
+
+def count_posts():
+    return _STRATEGIES[POST_COUNT_STRATEGY]()
+
+
+def _apply_delta(delta):
+    if POST_COUNT_STRATEGY == 'counter':
+        # No upsert: an unseeded counter is not read (see _counter_count)
+        Counter._get_collection().update_one({'_id': COUNTER_NAME}, {'$inc': {'value': delta}})
+    elif POST_COUNT_STRATEGY == 'cached' and _cache['value'] is not None:
+        # Keep this container's cached total in step with its own writes
+        _cache['value'] = max(_cache['value'] + delta, 0)
+
+
+def note_post_created():
+    _apply_delta(1)
+
+
+def note_post_deleted():
+    _apply_delta(-1)
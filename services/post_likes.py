@@ -0,0 +1,115 @@
+import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from models.like import Like
+from models.post_message import PostMessage
+from services import like_ingest
+from services.post_reader import POST_LIST_PROJECTION
+
+# Likes are documents in the likes collection (models/like.py), unique per (post, user), and
+# each post carries their count in likeCount. Every like that is actually inserted or deleted
+# moves likeCount by exactly one, with a find_one_and_update that also returns the post for
+# the response, so the count stays equal to the collection however requests interleave.
+#   toggle_like - like if the caller has not, else unlike (likePost)
+#   set_like    - like or unlike; idempotent, so a retried request cannot flip the state
+# Each returns (raw post row for serialize_post(), likedByMe), or (None, False) when there is no
+# such post. Post ids that are not ObjectIds raise bson.errors.InvalidId.
+# With LIKE_INGEST_MODE=events or buffer the likeCount change is deferred instead
+# (services/like_ingest.py) and the caller's own pending changes are added to what they read.
+TOGGLE_ATTEMPTS = 3 # A toggle only retries when a concurrent toggle by the same user won a race
+
+
+def _add_like(post_id, user_id):
+    """True if this call created the like. An upsert, so an existing like is found by the write
+    itself; the unique (post, user) index only has to settle two upserts racing each other."""
+    try:
+        result = Like._get_collection().update_one(
+            {'post': post_id, 'user': user_id},
+            {'$setOnInsert': {'createdAt': datetime.datetime.now(datetime.timezone.utc)}},
+            upsert=True,
+        )
+        return result.upserted_id is not None
+    except DuplicateKeyError: # The other upsert won
+        return False
+
+
+def _remove_like(post_id, user_id):
+    return Like._get_collection().delete_one({'post': post_id, 'user': user_id}).deleted_count == 1
+
+
+def _count_change(post_id, user_id, delta):
+    if like_ingest.deferred():
+        like_ingest.record(post_id, user_id, delta)
+        like_ingest.maybe_flush()
+        post = _read(post_id, user_id) # Read after any flush, so the overlay is not counted twice
+    else:
+        post = PostMessage._get_collection().find_one_and_update(
+            {'_id': post_id},
+            {'$inc': {'likeCount': delta}},
+            projection=POST_LIST_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+    if post is None and delta > 0:
+        _remove_like(post_id, user_id) # No such post: take back the like just inserted
+    return post
+
+
+def _unchanged(post_id):
+    return PostMessage._get_collection().find_one({'_id': post_id}, POST_LIST_PROJECTION)
+
+
+def _with_own_pending(post, user_id):
+    # Deferred modes: the count the caller sees includes their own changes not yet flushed
+    delta = like_ingest.own_pending(user_id, [post['_id']]).get(post['_id'], 0)
+    if delta:
+        post['likeCount'] = max((post.get('likeCount') or 0) + delta, 0)
+    return post
+
+
+def _read(post_id, user_id):
+    post = _unchanged(post_id)
+    if post is not None and like_ingest.deferred():
+        post = _with_own_pending(post, user_id)
+    return post
+
+
+def toggle_like(post_id, user_id):
+    post_id = ObjectId(post_id)
+    for _ in range(TOGGLE_ATTEMPTS):
+        if _add_like(post_id, user_id):
+            post = _count_change(post_id, user_id, 1)
+            return post, post is not None
+        if _remove_like(post_id, user_id):
+            return _count_change(post_id, user_id, -1), False
+        # Both lost to a concurrent toggle by the same user, which removed the like in between
+    liked = Like._get_collection().find_one({'post': post_id, 'user': user_id}, {'_id': 1}) is not None
+    return _read(post_id, user_id), liked
+
+
+def set_like(post_id, user_id, liked):
+    post_id = ObjectId(post_id)
+    changed = _add_like(post_id, user_id) if liked else _remove_like(post_id, user_id)
+    post = _count_change(post_id, user_id, 1 if liked else -1) if changed else _read(post_id, user_id)
+    return post, liked and post is not None
+
+
+def delete_post_likes(post_id):
+    Like._get_collection().delete_many({'post': ObjectId(str(post_id))})
+
+
+def mark_liked_by_me(posts, user_id):
+    """Sets likedByMe on serialized posts: one query for the whole page, none when anonymous."""
+    liked = set()
+    pending = {}
+    if user_id and posts:
+        post_ids = [post['id'] for post in posts]
+        cursor = Like._get_collection().find({'user': user_id, 'post': {'$in': post_ids}}, {'post': 1, '_id': 0})
+        liked = {doc['post'] for doc in cursor}
+        if like_ingest.deferred(): # One more query: the caller's likeCount changes not flushed yet
+            pending = like_ingest.own_pending(user_id, post_ids)
+    for post in posts:
+        post['likedByMe'] = post['id'] in liked
+        if pending.get(post['id']):
+            post['likeCount'] = max(post.get('likeCount', 0) + pending[post['id']], 0)
+    return posts
@@ -0,0 +1,35 @@
+from mongoengine.queryset.visitor import Q
+from models.post_message import PostMessage
+from services.post_serializer import POST_FIELDS
+
+# Read path for list endpoints that skips MongoEngine document hydration.
+# Rows come back from pymongo as plain dicts restricted to the serialized fields and go
+# straight to services.post_serializer.serialize_post().
+# Responses only carry the creator's id, so nothing here ever loads a User: list rows hold
+# the raw ObjectId and single posts are fetched with no_dereference().
+POST_LIST_PROJECTION = {field: 1 for field in POST_FIELDS}
+
+
+def list_queryset():
+    """PostMessage queryset yielding projected raw dicts instead of Documents."""
+    return PostMessage.objects.only(*POST_FIELDS).as_pymongo()
+
+
+def search_queryset(search_query, tags_list):
+    """Listing queryset for /posts/search: title contains search_query OR has any of tags_list."""
+    # Several keyword arguments to .objects() would mean AND, so the OR is built from Q objects
+    final_query = None
+    if search_query and tags_list:
+        final_query = Q(title__icontains=search_query) | Q(tags__in=tags_list)
+    elif search_query:
+        final_query = Q(title__icontains=search_query)
+    elif tags_list:
+        final_query = Q(tags__in=tags_list)
+    if final_query is None:
+        return PostMessage.objects.none() # Returns an empty queryset
+    return list_queryset().filter(final_query)
+
+
+def find_post(id):
+    """The PostMessage with this id (or None), with post.creator left as a DBRef."""
+    return PostMessage.objects(id=id).no_dereference().first()
@@ -0,0 +1,35 @@
+import datetime
+
+# The one place a post becomes a response dict, shared by every posts endpoint.
+# serialize_post() takes either a PostMessage or a raw row from pymongo (see
+# services/post_reader.py) and only shapes it: ObjectId, datetime and reference values are
+# left for the app's JSON provider (services/json_provider.py) to encode.
+# The encoded output matches PostMessage.to_json_serializable() byte for byte. Callers add the
+# per-caller likedByMe flag (services/post_likes.mark_liked_by_me).
+POST_FIELDS = ('title', 'message', 'name', 'creator', 'tags', 'selectedFile', 'likeCount',
+               'commentCount', 'commentPreview', 'createdAt')
+
+_LIST_FIELDS = ('tags', 'commentPreview')
+_COUNT_FIELDS = ('likeCount', 'commentCount')
+
+
+def serialize_post(post):
+    if not isinstance(post, dict):
+        # Document -> SON without dereferencing creator; applies the model's defaults
+        post = post.to_mongo()
+    data = {'id': post['_id']}
+    for field in POST_FIELDS:
+        value = post.get(field)
+        if field in _LIST_FIELDS and value is None: # ListFields hydrate missing and null as []
+            data[field] = []
+            continue
+        if field in _COUNT_FIELDS and value is None: # Not migrated yet, or nothing counted so far
+            value = 0
+        if field == 'createdAt' and field not in post:
+            value = datetime.datetime.now(datetime.timezone.utc)
+        if value is None: # to_mongo() drops None values
+            continue
+        if field == 'selectedFile' and isinstance(value, str) and value.startswith('data:image'):
+            continue # Do not send base64 selectedFile to client if it somehow still exists
+        data[field] = value
+    return data
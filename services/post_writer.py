@@ -0,0 +1,63 @@
+from bson import ObjectId
+from mongoengine.queryset.transform import update as transform_update
+from pymongo import ReturnDocument
+from models.post_message import PostMessage
+from services.post_reader import POST_LIST_PROJECTION
+
+# Single-round-trip writes to one post. The write itself finds the post, so there is no read
+# first: a PATCH is one find_one_and_update that comes back with the response row, a DELETE
+# one find_one_and_delete. Ownership is part of the filter (creator_id), so a post owned by
+# someone else simply does not match. Only when nothing matched is the post looked up again,
+# to answer 404 or 403.
+
+
+class PostNotFound(LookupError):
+    pass
+
+
+class NotPostCreator(PermissionError):
+    pass
+
+
+def _post_filter(post_id, creator_id):
+    """Raises bson.errors.InvalidId for post ids that are not ObjectIds."""
+    query = {'_id': ObjectId(post_id)}
+    if creator_id is not None:
+        # Posts store their creator as an ObjectId; any other user id (e.g. a Google 'sub')
+        # cannot own a post and is left as is, to match nothing
+        query['creator'] = ObjectId(creator_id) if ObjectId.is_valid(creator_id) else creator_id
+    return query
+
+
+def _not_matched(query):
+    if 'creator' in query and PostMessage._get_collection().count_documents({'_id': query['_id']}, limit=1):
+        return NotPostCreator("User not authorized to change this post")
+    return PostNotFound("Post not found")
+
+
+def post_update(**update_fields):
+    """MongoEngine-style updates (set__title=...) as a pymongo update document, checked against
+    PostMessage's fields the way QuerySet.update() checks them (raises ValidationError)."""
+    return transform_update(PostMessage, **update_fields)
+
+
+def modify_post(post_id, update, creator_id=None, before=False):
+    """Applies the pymongo `update` to the post and returns its response row (POST_LIST_PROJECTION)
+    as it is after the update, or as it was before with before=True. With creator_id, only
+    that user's post is changed. Raises PostNotFound or NotPostCreator when nothing matched."""
+    query = _post_filter(post_id, creator_id)
+    post = PostMessage._get_collection().find_one_and_update(
+        query, update, projection=POST_LIST_PROJECTION,
+        return_document=ReturnDocument.BEFORE if before else ReturnDocument.AFTER)
+    if post is None:
+        raise _not_matched(query)
+    return post
+
+
+def remove_post(post_id, creator_id=None):
+    """Deletes the post and returns its last row (POST_LIST_PROJECTION); errors as modify_post()."""
+    query = _post_filter(post_id, creator_id)
+    post = PostMessage._get_collection().find_one_and_delete(query, projection=POST_LIST_PROJECTION)
+    if post is None:
+        raise _not_matched(query)
+    return post
@@ -0,0 +1,110 @@
+import datetime
+import json
+import logging
+import os
+import random
+import re
+import sys
+
+# JSON-lines logging for the Lambda handler.
+# Every request gets one summary line (route, status, timings). Detailed dumps of the
+# event, headers and bodies are DEBUG only, truncated and sampled per route, with credential
+# headers (REDACTED_KEYS) masked.
+#   LOG_LEVEL           root level (default INFO)
+#   PYMONGO_LOG_LEVEL   level for pymongo's own logger (default WARNING)
+#   LOG_BODY_MAX_CHARS  longest string kept in logged bodies/events (default 512)
+#   LOG_SAMPLE_RATES    per-route sampling, e.g. "GET /posts=0.05,POST /posts=1,*=1".
+#                       Errors (status >= 500) are always logged.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+PYMONGO_LOG_LEVEL = os.getenv("PYMONGO_LOG_LEVEL", "WARNING").upper()
+LOG_BODY_MAX_CHARS = int(os.getenv("LOG_BODY_MAX_CHARS", "512"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+logger = logging.getLogger('memories')
+
+# Header/event keys, any case, whose values are credentials: bearer JWTs, session cookies
+REDACTED_KEYS = {'authorization', 'cookie', 'cookies', 'set-cookie', 'x-api-key'}
+REDACTED = '<redacted>'
+
+_OBJECT_ID_SEGMENT = re.compile(r'/[0-9a-fA-F]{24}(?=/|$)')
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+
+def parse_sample_rates(spec):
+    rates = {}
+    for item in spec.split(','):
+        if '=' in item:
+            route, rate = item.rsplit('=', 1)
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+_sample_rates = parse_sample_rates(LOG_SAMPLE_RATES)
+
+
+def configure_logging():
+    # The Lambda runtime installs its own handler on the root logger, so reuse it when
+    # present rather than adding a second one (which would print every line twice)
+    root = logging.getLogger()
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler(sys.stdout))
+    for handler in root.handlers:
+        handler.setFormatter(JsonLinesFormatter())
+    root.setLevel(LOG_LEVEL)
+    logging.getLogger('pymongo').setLevel(PYMONGO_LOG_LEVEL)
+
+
+def route_key(method, path):
+    """'GET /posts/<24 hex id>/likePost' -> 'GET /posts/:id/likePost', for sampling and grouping."""
+    path = _OBJECT_ID_SEGMENT.sub('/:id', (path or '/').rstrip('/') or '/')
+    return f"{method} {path}"
+
+
+def is_sampled(key):
+    rate = _sample_rates.get(key, _sample_rates.get('*', 1.0))
+    return rate >= 1.0 or random.random() < rate
+
+
+def truncate(value, limit=None):
+    """Copy of `value` with long strings (e.g. base64 selectedFile payloads) cut down and the
+    values of REDACTED_KEYS masked, at any depth (headers, multiValueHeaders, v2 cookies)."""
+    limit = LOG_BODY_MAX_CHARS if limit is None else limit
+    if isinstance(value, str):
+        return value if len(value) <= limit else f"{value[:limit]}...<{len(value) - limit} more chars>"
+    if isinstance(value, dict):
+        return {k: REDACTED if isinstance(k, str) and k.lower() in REDACTED_KEYS else truncate(v, limit)
+                for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [truncate(v, limit) for v in value]
+    return value
+
+
+def event_request_line(event):
+    """(method, path) of a v1 or v2 API Gateway proxy event."""
+    if event.get('version') == '2.0':
+        return event.get('requestContext', {}).get('http', {}).get('method', ''), event.get('rawPath', '')
+    return event.get('httpMethod', ''), event.get('path', '')
+
+
+def log_request_summary(key, status, duration_ms, sampled, **fields):
+    if not sampled and (status or 500) < 500:
+        return
+    level = logging.ERROR if (status or 500) >= 500 else logging.INFO
+    logger.log(level, "request", extra={'route': key, 'status': status, 'durationMs': round(duration_ms, 2), **fields})
@@ -0,0 +1,96 @@
+import os
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import OperationFailure
+from models.post_message import PostMessage
+from services.backoff import Backoff
+from services.pagination import InvalidCursor, pack_cursor, unpack_cursor
+from services.post_reader import POST_LIST_PROJECTION
+from services.request_logging import logger
+
+# Search engines behind /posts/search.
+# SEARCH_MODE:
+#   text  - $text over the post_text index (title, message and tags, weighted in the model),
+#           best matches first, SEARCH_LIMIT posts per page with a (score, _id) cursor
+#           (regex answers while the post_text index does not exist, e.g. before
+#           `python manage.py ensure-indexes`; once a query finds it missing, the container
+#           skips $text for TEXT_INDEX_RETRY_SECONDS)
+#   regex - the legacy case-insensitive title substring OR tags $in
+#           (services.post_reader.search_queryset); MongoEngine escapes the user's string
+#   bm25  - the in-process index in services/bm25_index.py, falling back to text while it is
+#           missing or stale
+# A search with tags but no searchQuery uses the (tags, -createdAt, -_id) index in either mode.
+# Modes other than text page newest first on the feed's (createdAt, _id) keyset.
+# Every page is bounded: ?limit= defaults to SEARCH_LIMIT and is capped at SEARCH_MAX_LIMIT,
+# which keeps responses well under API Gateway's 6 MB payload limit.
+SEARCH_MODE = os.getenv("SEARCH_MODE", "text")
+SEARCH_LIMIT = int(os.getenv("SEARCH_LIMIT", "20"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "50"))
+INDEX_NOT_FOUND = 27 # Server error code for a $text query on a collection with no text index
+TEXT_INDEX_RETRY_SECONDS = 60
+
+_text_index_missing = Backoff(TEXT_INDEX_RETRY_SECONDS)
+
+
+def use_bm25_search(search_query):
+    return SEARCH_MODE == 'bm25' and bool(search_query)
+
+
+def use_text_search(search_query):
+    return SEARCH_MODE in ('text', 'bm25') and bool(search_query)
+
+
+def text_terms(search_query, tags_list):
+    # $text ORs its terms and tags are in the text index, so "title words OR any of the
+    # tags" is a single $search string
+    return ' '.join([search_query] + tags_list)
+
+
+def decode_score_cursor(cursor):
+    try:
+        score, post_id = unpack_cursor(cursor)
+        return float(score), ObjectId(post_id)
+    except (ValueError, TypeError, InvalidId) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def text_search_pipeline(terms, cursor, limit):
+    pipeline = [
+        {'$match': {'$text': {'$search': terms}}},
+        {'$addFields': {'_score': {'$meta': 'textScore'}}},
+    ]
+    if cursor:
+        # Strictly after the last post of the previous page in (score desc, _id desc) order
+        score, post_id = decode_score_cursor(cursor)
+        pipeline.append({'$match': {'$or': [
+            {'_score': {'$lt': score}},
+            {'_score': score, '_id': {'$lt': post_id}},
+        ]}})
+    pipeline += [
+        {'$sort': {'_score': -1, '_id': -1}}, # Top-k sort: only limit + 1 posts are kept in memory
+        {'$limit': limit + 1},
+        {'$project': dict(POST_LIST_PROJECTION, _score=1)},
+    ]
+    return pipeline
+
+
+def text_search_page(search_query, tags_list, cursor, limit=SEARCH_LIMIT):
+    """Returns (raw rows, nextCursor) for one page of relevance-ranked results, or None when
+    there is no text index to search."""
+    if _text_index_missing.active():
+        return None
+    pipeline = text_search_pipeline(text_terms(search_query, tags_list), cursor, limit)
+    try:
+        rows = list(PostMessage._get_collection().aggregate(pipeline))
+    except OperationFailure as e:
+        if e.code != INDEX_NOT_FOUND:
+            raise
+        _text_index_missing.start()
+        logger.warning("text index missing, searching by regex",
+                       extra={'error': str(e), 'retrySeconds': TEXT_INDEX_RETRY_SECONDS})
+        return None
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = pack_cursor([last['_score'], str(last['_id'])])
+    return rows[:limit], next_cursor
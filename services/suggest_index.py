@@ -0,0 +1,193 @@
+import heapq
+import os
+import time
+from array import array
+from bisect import bisect_left
+from models.post_message import PostMessage
+from services import change_log
+from services.backoff import REBUILD_BACKOFF_SECONDS, Backoff
+from services.request_logging import logger
+
+# In-memory prefix index behind /posts/suggest: the tags and titles that start with what the
+# user has typed so far, most used first.
+# Each kind is a PrefixIndex: lower-cased keys in one sorted list with parallel counts and
+# display forms, so a prefix is a bisect to a contiguous range. Short prefixes cover large
+# ranges; their top entries are memoized until a key under them changes.
+# The index is built from one scan of postmessages per container, then caught up from the change
+# log (services/change_log.py) at most every SUGGEST_SYNC_SECONDS; writes show up within that
+# (within REBUILD_BACKOFF_SECONDS while a write burst keeps a fresh build from catching up).
+# It remembers each post's title and tags, so an update or delete takes back exactly what the
+# post had added. That scan runs inside the first /posts/suggest request of a container, so it
+# is only done up to SUGGEST_BUILD_MAX_DOCS posts; above that the endpoint answers 503.
+#   SUGGEST_ENABLED    1 turns on the endpoint and the change-log writes it needs (default off)
+#   SUGGEST_LIMIT      suggestions per kind when ?limit= is absent; SUGGEST_MAX_LIMIT caps it
+SUGGEST_ENABLED = os.getenv("SUGGEST_ENABLED", "0") == "1"
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "10"))
+SUGGEST_MAX_LIMIT = int(os.getenv("SUGGEST_MAX_LIMIT", "20"))
+SUGGEST_BUILD_MAX_DOCS = int(os.getenv("SUGGEST_BUILD_MAX_DOCS", "100000"))
+SUGGEST_SYNC_SECONDS = float(os.getenv("SUGGEST_SYNC_SECONDS", "2"))
+SUGGEST_MAX_PENDING = int(os.getenv("SUGGEST_MAX_PENDING", "1000")) # Change-log entries per sync, else rebuild
+MEMO_MIN_RANGE = 256 # Ranges smaller than this are scanned on every request
+MAX_CHAR = '\U0010ffff'
+SOURCE_PROJECTION = {'title': 1, 'tags': 1}
+
+if SUGGEST_ENABLED:
+    change_log.register_reader('suggest')
+
+
+def normalize(value):
+    return ' '.join(value.split()).lower()
+
+
+class PrefixIndex:
+    def __init__(self, counts, display):
+        self.keys = sorted(counts)
+        self.counts = array('I', (counts[key] for key in self.keys))
+        self.display = [display[key] for key in self.keys]
+        self._memo = {} # prefix -> top SUGGEST_MAX_LIMIT (display, count) pairs
+
+    def __len__(self):
+        return len(self.keys)
+
+    def span(self, prefix):
+        """(lo, hi): the keys starting with prefix are keys[lo:hi]."""
+        lo = bisect_left(self.keys, prefix)
+        return lo, bisect_left(self.keys, prefix + MAX_CHAR, lo)
+
+    def top(self, prefix, limit):
+        memo = self._memo.get(prefix)
+        if memo is not None:
+            return memo[:limit]
+        lo, hi = self.span(prefix)
+        counts = self.counts
+        # Highest count first, then alphabetical; keys whose count dropped to 0 wait for a rebuild
+        size = SUGGEST_MAX_LIMIT if hi - lo >= MEMO_MIN_RANGE else limit
+        best = heapq.nsmallest(size, ((-counts[i], i) for i in range(lo, hi) if counts[i]))
+        result = [(self.display[i], -negative) for negative, i in best]
+        if hi - lo >= MEMO_MIN_RANGE:
+            self._memo[prefix] = result
+        return result[:limit]
+
+    def add(self, key, display, delta):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            self.counts[i] = max(0, self.counts[i] + delta)
+        elif delta > 0:
+            self.keys.insert(i, key)
+            self.counts.insert(i, delta)
+            self.display.insert(i, display)
+        else:
+            return
+        for end in range(len(key) + 1):
+            self._memo.pop(key[:end], None)
+
+
+def post_entries(row):
+    """{key: display} for a post's title and for its tags; each counts once per post."""
+    title = ' '.join((row.get('title') or '').split())
+    titles = {title.lower(): title} if title else {}
+    tags = {}
+    for tag in row.get('tags') or []:
+        tag = ' '.join(tag.split()) if isinstance(tag, str) else ''
+        if tag:
+            tags.setdefault(tag.lower(), tag)
+    return titles, tags
+
+
+class SuggestIndex:
+    def __init__(self, rows, watermark, applied=()):
+        self.posts = {} # post _id -> (titles, tags) as counted
+        counts = ({}, {})
+        display = ({}, {})
+        for row in rows:
+            entries = post_entries(row)
+            self.posts[row['_id']] = entries
+            for kind, kind_entries in enumerate(entries):
+                for key, shown in kind_entries.items():
+                    counts[kind][key] = counts[kind].get(key, 0) + 1
+                    display[kind].setdefault(key, shown)
+        self.titles = PrefixIndex(counts[0], display[0])
+        self.tags = PrefixIndex(counts[1], display[1])
+        self.changes = change_log.ChangeFollower(watermark, applied)
+        self.synced_at = None
+
+    def _count(self, entries, delta):
+        for index, kind_entries in zip((self.titles, self.tags), entries):
+            for key, shown in kind_entries.items():
+                index.add(key, shown, delta)
+
+    def apply(self, post_ids):
+        """Re-reads these posts and replaces whatever the index counted for them."""
+        post_ids = list(set(post_ids))
+        rows = {row['_id']: row for row in
+                PostMessage._get_collection().find({'_id': {'$in': post_ids}}, SOURCE_PROJECTION)}
+        for post_id in post_ids:
+            previous = self.posts.pop(post_id, None)
+            if previous is not None:
+                self._count(previous, -1)
+            row = rows.get(post_id)
+            if row is not None: # Deleted posts just stay out
+                entries = post_entries(row)
+                self.posts[post_id] = entries
+                self._count(entries, 1)
+
+    def sync(self):
+        """Catches up on the change log; False when the index is too far behind to keep."""
+        now = time.monotonic()
+        if self.synced_at is not None and now - self.synced_at < SUGGEST_SYNC_SECONDS:
+            return True
+        changes = self.changes.pending(SUGGEST_MAX_PENDING)
+        if changes is None:
+            return False
+        if changes:
+            self.apply([change['post'] for change in changes])
+            self.changes.mark_applied(changes)
+        self.synced_at = now
+        return True
+
+    def suggest(self, prefix, limit):
+        prefix = normalize(prefix)
+        if not prefix:
+            return {'tags': [], 'titles': []}
+        return {
+            'tags': [{'value': value, 'count': count} for value, count in self.tags.top(prefix, limit)],
+            'titles': [{'value': value, 'count': count} for value, count in self.titles.top(prefix, limit)],
+        }
+
+
+_index = None
+_rebuild_backoff = Backoff(REBUILD_BACKOFF_SECONDS)
+
+
+def _build():
+    global _index
+    collection = PostMessage._get_collection()
+    if collection.estimated_document_count() > SUGGEST_BUILD_MAX_DOCS:
+        _index = None
+        _rebuild_backoff.start()
+        logger.warning("suggest index not built, too many posts", extra={'maxDocs': SUGGEST_BUILD_MAX_DOCS})
+        return None
+    t0 = time.perf_counter()
+    position = change_log.scan_position() # Taken before the scan; later entries are re-applied
+    _index = SuggestIndex(collection.find({}, SOURCE_PROJECTION), *position)
+    logger.info("suggest index built", extra={
+        'posts': len(_index.posts), 'tags': len(_index.tags), 'titles': len(_index.titles),
+        'buildMs': round((time.perf_counter() - t0) * 1000, 1),
+    })
+    if not _index.sync():
+        # More writes landed during the scan than one sync applies. Rebuilding again right away
+        # would scan postmessages on every request, so this index is served as built until
+        # the backoff ends
+        _rebuild_backoff.start()
+        logger.warning("suggest index behind after build", extra={'backoffSeconds': REBUILD_BACKOFF_SECONDS})
+    return _index
+
+
+def get_suggest_index():
+    """The container's index, caught up with the change log; built on first use. None when
+    postmessages has more than SUGGEST_BUILD_MAX_DOCS posts."""
+    if _rebuild_backoff.active():
+        return _index # As built, or None while the collection is too large
+    if _index is not None and _index.sync():
+        return _index
+    return _build()
@@ -0,0 +1,59 @@
+import os
+from pymongo import UpdateOne
+from models.post_message import PostMessage
+from models.tag_stat import TagStat
+
+# Per-tag post counts behind GET /posts/tags, so tag facets never aggregate over postmessages.
+# create/update/delete_post pass the tags a post had and has now; only the difference is
+# applied, as one bulk_write of $inc per changed tag. Tags are counted once per post, with the
+# exact spelling the post stores (the same matching as search's tags $in).
+# The counts can drift: a post written concurrently by two requests, or a write that fails
+# between the post and its $inc. `python manage.py rebuild-tag-stats` recounts them.
+TAGS_LIMIT = int(os.getenv("TAGS_LIMIT", "20"))
+TAGS_MAX_LIMIT = int(os.getenv("TAGS_MAX_LIMIT", "100"))
+
+
+def _distinct(tags):
+    # Posts written before tags were validated may hold a bare string; it counts as no tags,
+    # rather than as one tag per character
+    if not isinstance(tags, (list, tuple)):
+        return set()
+    return {tag for tag in tags if isinstance(tag, str) and tag}
+
+
+def note_tags_changed(old_tags, new_tags):
+    old, new = _distinct(old_tags), _distinct(new_tags)
+    ops = [UpdateOne({'_id': tag}, {'$inc': {'count': 1}}, upsert=True) for tag in sorted(new - old)]
+    # No upsert: a tag missing here was never counted, and a negative count helps nobody
+    ops += [UpdateOne({'_id': tag}, {'$inc': {'count': -1}}) for tag in sorted(old - new)]
+    if ops:
+        TagStat._get_collection().bulk_write(ops, ordered=False)
+
+
+def popular_tags(limit):
+    """The most used tags, one read of the (-count, -_id) index."""
+    cursor = TagStat._get_collection().find({'count': {'$gt': 0}}).sort([('count', -1), ('_id', -1)]).limit(limit)
+    return [{'tag': doc['_id'], 'count': doc['count']} for doc in cursor]
+
+
+def tag_counts(tags):
+    """Counts for these tags, in the order asked; tags no post uses count 0."""
+    found = {doc['_id']: doc['count'] for doc in TagStat._get_collection().find({'_id': {'$in': tags}})}
+    return [{'tag': tag, 'count': max(found.get(tag, 0), 0)} for tag in tags]
+
+
+def rebuild_pipeline():
+    return [
+        {'$project': {'tags': {'$setUnion': [{'$ifNull': ['$tags', []]}, []]}}}, # Once per post
+        {'$unwind': '$tags'},
+        {'$match': {'tags': {'$type': 'string', '$ne': ''}}},
+        {'$group': {'_id': '$tags', 'count': {'$sum': 1}}},
+        {'$out': TagStat._get_collection_name()},
+    ]
+
+
+def rebuild_tag_stats():
+    """Recounts every tag from postmessages. $out swaps the collection in one step and keeps its
+    indexes; $inc from writes that land while the aggregation runs are lost until the next run."""
+    PostMessage._get_collection().aggregate(rebuild_pipeline())
+    return TagStat._get_collection().count_documents({})
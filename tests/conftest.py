@@ -0,0 +1,14 @@
+import os
+import sys
+import pytest
+
+# The app's modules are imported from the repository root, as manage.py and app.py do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def bench_db():
+    """The app's connection pointed at BENCH_CONNECTION_URL (benchmarks/common.py), which the
+    tests wipe and seed as they need."""
+    from benchmarks.common import connect_bench_db
+    connect_bench_db()
@@ -0,0 +1,54 @@
+import pytest
+from pymongo import monitoring
+from benchmarks.common import CommandCounter, real_mongod_available, seed_posts
+
+# Mongo commands per read request, counted with a pymongo CommandListener: a feed or search
+# request issues the same number of commands whatever its page size, and no read touches the
+# users collection (a creator lookup per post). Page sizes stay at or below 100: larger cursor
+# pages legitimately add a getMore.
+
+pytestmark = pytest.mark.skipif(
+    not real_mongod_available(), reason="needs a mongod at BENCH_CONNECTION_URL; mongomock emits no command events")
+
+# Registered at import, before bench_db creates the client it has to observe
+command_counter = CommandCounter()
+monitoring.register(command_counter)
+
+LIMITS = [8, 25, 100]
+
+
+def test_read_commands_do_not_depend_on_page_size(bench_db, monkeypatch):
+    import app
+    from models.post_message import PostMessage
+    from routes import posts_routes
+    from services import feed_query, post_count
+
+    seed_posts(500)
+    post_id = str(PostMessage.objects.order_by('-id').first().id)
+    client = app.app.test_client()
+    # The only setting where facet is used at all (services/feed_query.use_facet)
+    monkeypatch.setattr(post_count, 'POST_COUNT_STRATEGY', 'exact')
+
+    requests = []
+    for mode in ('facet', 'split'):
+        requests += [(f"page=1 {mode}", mode, '/posts/?page=1'), (f"page=3 {mode}", mode, '/posts/?page=3')]
+    requests += [('cursor first', None, '/posts/?cursor='), ('cursor next', None, None),
+                 ('search', None, '/posts/search?searchQuery=sun&tags=food,art'),
+                 ('single post', None, f'/posts/{post_id}')]
+
+    counts = {}
+    for limit in LIMITS:
+        monkeypatch.setattr(posts_routes, 'LIMIT', limit)
+        cursor = None
+        for name, mode, url in requests:
+            if mode:
+                monkeypatch.setattr(feed_query, 'FEED_QUERY_MODE', mode)
+            url = url or f'/posts/?cursor={cursor}'
+            before, users_before = command_counter.count, command_counter.collections.get('users', 0)
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.data)
+            assert command_counter.collections.get('users', 0) == users_before, f"{name} queried the users collection"
+            counts.setdefault(name, set()).add(command_counter.count - before)
+            cursor = response.get_json().get('nextCursor') or cursor
+
+    assert {name: sorted(seen) for name, seen in counts.items() if len(seen) > 1} == {}
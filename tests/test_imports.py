@@ -0,0 +1,9 @@
+import manage
+
+# Cold-start guard: `import app` must not load the modules manage.DEFERRED_MODULES lists
+# (boto3, bcrypt, dns) or build Flask's Jinja environment. Runs the import in a fresh
+# interpreter, so it needs no database and nothing imported by other tests can leak in.
+
+
+def test_import_app_defers_heavy_modules():
+    assert manage.startup_import_problems() == []
@@ -0,0 +1,82 @@
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from bson import ObjectId
+from benchmarks.common import connect_bench_db, real_mongod_available, seed_posts
+from benchmarks.load_likes import reset, set_sequences, toggle_in_process, toggle_storm
+
+# Concurrent like changes on one post (benchmarks/load_likes.py): whatever the interleaving,
+# every user ends up in the state they last asked for, and likeCount equals the post's documents
+# in the likes collection. Threads run on BENCH_CONNECTION_URL when it is a mongod, else on
+# mongomock; several processes, each with its own client, need a mongod.
+
+USERS = 40
+WORKERS = 16
+# The collection calls services/post_likes.py makes
+MONGOMOCK_CALLS = ['find_one', 'find_one_and_update', 'update_one', 'delete_one']
+
+
+def serialize_mongomock(monkeypatch):
+    # mongomock's collections are not thread-safe (its dicts change under a running query).
+    # One lock per call gives each operation the atomicity a server does, while the calls that
+    # make up one toggle still interleave with other threads' calls.
+    import mongomock
+    lock = threading.RLock()
+    def locked(method):
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            with lock:
+                return method(*args, **kwargs)
+        return call
+    for name in MONGOMOCK_CALLS:
+        monkeypatch.setattr(mongomock.Collection, name, locked(getattr(mongomock.Collection, name)))
+
+
+@pytest.fixture
+def post_id(monkeypatch):
+    if real_mongod_available():
+        connect_bench_db()
+    else:
+        serialize_mongomock(monkeypatch)
+        connect_bench_db('mongomock://localhost/memories_test')
+    from models.like import Like
+    collection = seed_posts(1)
+    Like._get_collection().drop()
+    Like.ensure_indexes() # The unique (post, user) index
+    post_id = collection.find_one()['_id']
+    reset(collection, post_id) # No likes, likeCount 0
+    return post_id
+
+
+def liked_users(post_id):
+    from models.like import Like
+    from models.post_message import PostMessage
+    users = [like.user for like in Like.objects(post=post_id)]
+    assert PostMessage.objects(id=post_id).first().likeCount == len(users)
+    return users
+
+
+@pytest.mark.parametrize('toggles', [2, 3])
+def test_toggle_storm_keeps_like_count(post_id, toggles):
+    users = [str(ObjectId()) for _ in range(USERS)]
+    toggle_storm(post_id, users, toggles, WORKERS)
+    liked = liked_users(post_id)
+    assert len(liked) == len(set(liked))
+    assert set(liked) == (set(users) if toggles % 2 else set())
+
+
+def test_set_like_ends_in_last_requested_state(post_id):
+    users = [str(ObjectId()) for _ in range(USERS)]
+    set_sequences(post_id, users, 3, WORKERS) # like, unlike, like
+    assert sorted(liked_users(post_id)) == sorted(users)
+
+
+@pytest.mark.skipif(not real_mongod_available(), reason="needs a mongod at BENCH_CONNECTION_URL")
+def test_toggles_from_several_processes_keep_like_count(post_id):
+    users = [str(ObjectId()) for _ in range(USERS)]
+    processes = 3 # Each toggles every user once: an odd total, so everyone ends up liking
+    with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        list(pool.map(toggle_in_process, *zip(*[(post_id, users, 1, WORKERS)] * processes)))
+    assert sorted(liked_users(post_id)) == sorted(users)
@@ -0,0 +1,17 @@
+import pytest
+from benchmarks.common import real_mongod_available, seed_posts
+
+# Every route's query shape (tools/indexes.query_shapes) must be served by a declared index:
+# no COLLSCAN and no in-memory SORT beyond what the shape is allowed. A dropped or changed index
+# in a model's meta fails here rather than waiting for `python manage.py explain-check`.
+
+pytestmark = pytest.mark.skipif(
+    not real_mongod_available(), reason="needs a mongod at BENCH_CONNECTION_URL; mongomock has no query planner")
+
+
+def test_route_queries_use_indexes(bench_db):
+    from tools.indexes import ensure_indexes, explain_check
+
+    seed_posts(200)
+    ensure_indexes()
+    assert explain_check() == 0
@@ -0,0 +1,162 @@
+import compileall
+import fnmatch
+import glob
+import os
+import py_compile
+import re
+import shutil
+import subprocess
+import sys
+import zipfile
+
+# Builds the Lambda dependency layer for exactly one runtime.
+#   1. pip installs requirements-layer.txt as binary wheels for the target CPython/platform
+#   2. prunes what the runtime never loads: C sources and headers, type stubs, tests,
+#      dist-info, __pycache__, installer leftovers and extension modules built for other ABIs
+#   3. precompiles .pyc files with unchecked hashes. /opt is read-only on Lambda, so
+#      without them every cold start compiles the whole dependency tree again.
+#      This step only runs when the build interpreter matches the target version.
+#   4. verifies that the bson, pymongo and bcrypt extensions for the target ABI are present
+#      (and actually load, when the versions match)
+#   5. writes a zip with sorted entries and fixed timestamps, so identical inputs give
+#      a byte-identical layer
+# Usage: python manage.py build-layer [--python-version 3.12] [--platform manylinux2014_x86_64]
+
+DEFAULT_PYTHON_VERSION = "3.12"
+DEFAULT_PLATFORM = "manylinux2014_x86_64" # manylinux2014_aarch64 for arm64 functions
+PRUNE_PACKAGES = ['pip', 'setuptools', 'wheel', '_distutils_hack', 'pkg_resources', 'bin']
+PRUNE_FILE_PATTERNS = ['*.c', '*.h', '*.pyx', '*.pxd', '*.pyi', 'py.typed']
+PRUNE_DIR_NAMES = ['__pycache__', 'tests', 'test', 'testing']
+# (package dir, extension module name); bcrypt ships a stable-ABI (abi3) build
+REQUIRED_EXTENSIONS = [('bson', '_cbson'), ('pymongo', '_cmessage'), ('bcrypt', '_bcrypt')]
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+
+
+def site_packages_dir(build_dir, python_version):
+    return os.path.join(build_dir, 'python', 'lib', f"python{python_version}", 'site-packages')
+
+
+def install(requirements, target, python_version, platform):
+    subprocess.run([
+        sys.executable, '-m', 'pip', 'install',
+        '--requirement', requirements,
+        '--target', target,
+        '--platform', platform,
+        '--implementation', 'cp',
+        '--python-version', python_version,
+        '--only-binary=:all:',
+        '--no-compile',
+        '--upgrade',
+    ], check=True)
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def prune(site_packages, python_version, keep_dist_info=False, extra_packages=()):
+    removed = []
+    for name in list(PRUNE_PACKAGES) + list(extra_packages):
+        for path in glob.glob(os.path.join(site_packages, name)):
+            removed.append(path)
+            _remove(path)
+    if not keep_dist_info:
+        for path in glob.glob(os.path.join(site_packages, '*.dist-info')):
+            removed.append(path)
+            _remove(path)
+
+    abi_tag = 'cpython-' + python_version.replace('.', '')
+    other_abi = re.compile(r'\.cpython-\d+[a-z]*-[^.]+\.(so|pyd)$')
+    for root, dirs, files in os.walk(site_packages, topdown=True):
+        for name in list(dirs):
+            if name in PRUNE_DIR_NAMES:
+                removed.append(os.path.join(root, name))
+                _remove(os.path.join(root, name))
+                dirs.remove(name)
+        for name in files:
+            path = os.path.join(root, name)
+            if any(fnmatch.fnmatch(name, pattern) for pattern in PRUNE_FILE_PATTERNS):
+                removed.append(path)
+                os.remove(path)
+            elif other_abi.search(name) and abi_tag not in name:
+                removed.append(path)
+                os.remove(path)
+    return removed
+
+
+def precompile(site_packages, python_version):
+    current = f"{sys.version_info.major}.{sys.version_info.minor}"
+    if current != python_version:
+        print(f"skipping .pyc precompilation: building with Python {current}, target is {python_version}")
+        return False
+    compileall.compile_dir(
+        site_packages, quiet=1, workers=0,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+    return True
+
+
+def verify_extensions(site_packages, python_version):
+    """Returns a list of problems; empty when every required extension is there (and loads)."""
+    abi_tag = 'cpython-' + python_version.replace('.', '')
+    problems = []
+    for package, module in REQUIRED_EXTENSIONS:
+        candidates = glob.glob(os.path.join(site_packages, package, f"{module}.*.so"))
+        if not any(abi_tag in path or '.abi3.' in path for path in candidates):
+            problems.append(f"{package}/{module}: no build for {abi_tag}")
+
+    current = f"{sys.version_info.major}.{sys.version_info.minor}"
+    if current == python_version and not problems:
+        # Import the layer in a clean interpreter and ask the packages themselves
+        code = "import bson, pymongo, bcrypt; print(bson.has_c(), pymongo.has_c())"
+        result = subprocess.run([sys.executable, '-S', '-c', code], capture_output=True, text=True,
+                                env=dict(os.environ, PYTHONPATH=site_packages))
+        if result.returncode != 0:
+            problems.append(f"importing the layer failed: {result.stderr.strip()}")
+        elif result.stdout.split() != ['True', 'True']:
+            problems.append(f"bson/pymongo C extensions did not load (has_c: {result.stdout.strip()})")
+    return problems
+
+
+def write_zip(build_dir, zip_path):
+    paths = []
+    for root, dirs, files in os.walk(build_dir):
+        dirs.sort()
+        for name in sorted(files):
+            paths.append(os.path.join(root, name))
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+        for path in paths:
+            info = zipfile.ZipInfo(os.path.relpath(path, build_dir), date_time=ZIP_TIMESTAMP)
+            info.external_attr = (0o755 if os.access(path, os.X_OK) else 0o644) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(path, 'rb') as f:
+                archive.writestr(info, f.read())
+    return len(paths)
+
+
+def build_layer(requirements='requirements-layer.txt', build_dir='build/layer', zip_path='build/layer.zip',
+                python_version=DEFAULT_PYTHON_VERSION, platform=DEFAULT_PLATFORM,
+                keep_dist_info=False, extra_prune=()):
+    if os.path.exists(build_dir):
+        shutil.rmtree(build_dir)
+    site_packages = site_packages_dir(build_dir, python_version)
+    os.makedirs(site_packages)
+
+    install(requirements, site_packages, python_version, platform)
+    removed = prune(site_packages, python_version, keep_dist_info, extra_prune)
+    print(f"pruned {len(removed)} files and directories")
+    precompile(site_packages, python_version)
+
+    problems = verify_extensions(site_packages, python_version)
+    for problem in problems:
+        print(f"ERROR: {problem}")
+    if problems:
+        return 1
+
+    os.makedirs(os.path.dirname(zip_path) or '.', exist_ok=True)
+    count = write_zip(build_dir, zip_path)
+    print(f"wrote {zip_path}: {count} files, {os.path.getsize(zip_path) / 1024 / 1024:.1f} MiB")
+    return 0
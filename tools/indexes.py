@@ -0,0 +1,120 @@
+import datetime
+import json
+from models.comment import Comment
+from models.counter import Counter
+from models.like import Like
+from models.like_event import LikeEvent
+from models.post_change import PostChange
+from models.post_message import PostMessage
+from models.tag_stat import TagStat
+from models.user_model import User
+from services.feed_query import facet_pipeline
+from services.pagination import encode_cursor, keyset_queryset, pack_cursor
+from services.post_comments import COMMENTS_LIMIT, THREAD_LIMIT, thread_queryset
+from services.post_reader import list_queryset, search_queryset
+from services.search import text_search_pipeline
+from services.tag_stats import TAGS_LIMIT
+
+# Index maintenance and query-plan checks, run outside the request path.
+#   python manage.py ensure-indexes   create every index the models declare (idempotent) and
+#                                     list existing ones they no longer declare
+#   python manage.py explain-check    explain each route's query shape; exit 1 on a COLLSCAN
+#                                     or an in-memory SORT the shape is not allowed
+# The models set auto_create_index: False, so a request never issues createIndexes.
+# Both commands use CONNECTION_URL, like the app.
+
+MODELS = [PostMessage, User, Counter, PostChange, TagStat, Like, LikeEvent, Comment]
+FORBIDDEN_STAGES = {'COLLSCAN', 'SORT', '$sort'}
+LIMIT = 8
+
+
+def ensure_indexes():
+    for model in MODELS:
+        model.ensure_indexes() # createIndexes is a no-op for indexes that already exist
+        names = sorted(model._get_collection().index_information())
+        print(f"{model._get_collection_name():<14} {', '.join(names)}")
+        # Indexes the model no longer declares are reported, never dropped automatically
+        for keys in model.compare_indexes()['extra']:
+            print(f"{'':<14} not declared any more: {keys}")
+    return 0
+
+
+def _plan_stages(explain):
+    """Stage names of the winning plan(s) in an explain() result, plus unabsorbed pipeline stages."""
+    stages = []
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'rejectedPlans':
+                    continue
+                if key == 'stage' and isinstance(value, str):
+                    stages.append(value)
+                walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+    walk(explain.get('queryPlanner', {}).get('winningPlan', {}))
+    for stage in explain.get('stages', []): # Aggregations: $cursor (the query layer) + the rest
+        for name, body in stage.items():
+            if name == '$cursor':
+                walk(body.get('queryPlanner', {}).get('winningPlan', {}))
+            else:
+                stages.append(name)
+    return stages
+
+
+def _explain_aggregate(model, pipeline):
+    collection = model._get_collection()
+    return collection.database.command(
+        'explain', {'aggregate': collection.name, 'pipeline': pipeline, 'cursor': {}}, verbosity='queryPlanner')
+
+
+def query_shapes():
+    """(name, explain thunk, stages this shape may use anyway) for each route's queries."""
+    newest = PostMessage.objects.order_by('-createdAt', '-id').no_dereference().first()
+    cursor = encode_cursor(newest.createdAt, newest.id) if newest else encode_cursor(datetime.datetime(2024, 1, 1), '0' * 24)
+    post_id = newest.id if newest else '0' * 24
+    # An unanchored, case-insensitive title regex can only be served by a full scan of the title
+    # index, which is not in createdAt order, so the newest-first sort stays in memory
+    regex_sort = {'SORT'}
+    # Relevance order only exists after the text match, so text search always sorts the
+    # matches in memory; $sort + $limit keeps just the top page there
+    score_sort = {'SORT', '$sort'}
+    return [
+        ('feed ?page (split)', lambda: list_queryset().order_by('-id').skip(2 * LIMIT).limit(LIMIT).explain(), set()),
+        ('feed ?page (facet)', lambda: _explain_aggregate(PostMessage, facet_pipeline(2 * LIMIT, LIMIT)), set()),
+        ('feed ?cursor first', lambda: keyset_queryset(list_queryset(), '', LIMIT).explain(), set()),
+        ('feed ?cursor next', lambda: keyset_queryset(list_queryset(), cursor, LIMIT).explain(), set()),
+        ('search tags', lambda: keyset_queryset(search_queryset('', ['food', 'art']), '', LIMIT).explain(), set()),
+        ('search tags next', lambda: keyset_queryset(search_queryset('', ['food', 'art']), cursor, LIMIT).explain(), set()),
+        ('search title', lambda: keyset_queryset(search_queryset('sun', []), '', LIMIT).explain(), regex_sort),
+        ('search title+tags', lambda: keyset_queryset(search_queryset('sun', ['food']), cursor, LIMIT).explain(), regex_sort),
+        ('search text', lambda: _explain_aggregate(PostMessage, text_search_pipeline('sunset food', None, LIMIT)), score_sort),
+        ('search text next', lambda: _explain_aggregate(PostMessage, text_search_pipeline(
+            'sunset food', pack_cursor([1.0, '0' * 24]), LIMIT)), score_sort),
+        ('comments', lambda: keyset_queryset(Comment.objects(post=post_id, parent=None), '', COMMENTS_LIMIT).explain(), set()),
+        ('comments next', lambda: keyset_queryset(
+            Comment.objects(post=post_id, parent=None), cursor, COMMENTS_LIMIT).explain(), set()),
+        ('comment thread', lambda: thread_queryset(post_id, '0' * 24, None, '', THREAD_LIMIT).explain(), set()),
+        ('comment thread perLevel', lambda: thread_queryset(
+            post_id, '0' * 24, 3, pack_cursor(['000001']), THREAD_LIMIT).explain(), set()),
+        ('single post', lambda: PostMessage.objects(id=post_id).explain(), set()),
+        ('liked by me', lambda: Like.objects(user='0' * 24, post__in=[post_id]).explain(), set()),
+        ('own pending likes', lambda: LikeEvent.objects(user='0' * 24, post__in=[post_id]).explain(), set()),
+        ('popular tags', lambda: TagStat.objects(count__gt=0).order_by('-count', '-id').limit(TAGS_LIMIT).explain(), set()),
+        ('tag counts', lambda: TagStat.objects(id__in=['food', 'art']).explain(), set()),
+        ('user by email', lambda: User.objects(email='user0@example.com').explain(), set()),
+    ]
+
+
+def explain_check(verbose=False):
+    failures = 0
+    for name, explain, allowed in query_shapes():
+        result = explain()
+        stages = _plan_stages(result)
+        bad = sorted((set(stages) & FORBIDDEN_STAGES) - allowed)
+        failures += bool(bad)
+        print(f"{'FAIL' if bad else 'ok':<5} {name:<22} {' > '.join(stages)}")
+        if verbose or bad:
+            print(json.dumps(result.get('queryPlanner', result), indent=2, default=str))
+    return 1 if failures else 0
@@ -0,0 +1,80 @@
+import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from models.comment import Comment
+from models.post_message import PostMessage
+from services.post_comments import refresh_comment_summaries, thread_fields
+
+# Moves the legacy PostMessage.comments string arrays into the comments collection.
+#   python manage.py migrate-comments            posts that still have a comments array: one
+#                                                comment per string, then commentCount and
+#                                                commentPreview from the collection, array dropped
+#   python manage.py migrate-comments --refresh  rebuild commentCount and commentPreview for every post
+#   python manage.py migrate-comments --threads  give comments written before reply threads their
+#                                                thread fields, so their threads include them
+# The old strings carry no author or time. They keep their text ("Name: comment", as the client
+# sent it), get no author, and are dated a millisecond apart from the post's createdAt so their
+# order survives. Those (post, createdAt, text) keys make the inserts upserts, so the command
+# is safe to re-run, also after a crash halfway through a batch. Run ensure-indexes first.
+
+
+def migrate_comments(batch_size=200, refresh=False):
+    posts = PostMessage._get_collection()
+    query = {} if refresh else {'comments': {'$exists': True}}
+    cursor = posts.find(query, {'comments': 1, 'createdAt': 1}).sort('_id', 1).batch_size(batch_size)
+    migrated = comments = 0
+    batch = []
+    def flush():
+        nonlocal migrated, comments
+        post_ids = [row['_id'] for row in batch]
+        if not refresh:
+            ops = []
+            for row in batch:
+                start = row.get('createdAt') or row['_id'].generation_time.replace(tzinfo=None)
+                for i, text in enumerate(row.get('comments') or []):
+                    if not isinstance(text, str) or not text:
+                        continue
+                    created_at = start + datetime.timedelta(milliseconds=i + 1)
+                    comment_id = ObjectId()
+                    ops.append(UpdateOne({'post': row['_id'], 'createdAt': created_at, 'text': text},
+                                         {'$setOnInsert': {'_id': comment_id, 'author': None,
+                                                           **thread_fields(comment_id, None, 0)}},
+                                         upsert=True))
+            if ops:
+                Comment._get_collection().bulk_write(ops, ordered=False)
+            comments += len(ops)
+        refresh_comment_summaries(post_ids)
+        if not refresh:
+            posts.update_many({'_id': {'$in': post_ids}}, {'$unset': {'comments': ''}})
+        migrated += len(batch)
+        batch.clear()
+
+    for row in cursor:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    print(f"{migrated} posts {'refreshed' if refresh else 'migrated'}" + ('' if refresh else f", {comments} comments copied"))
+    return 0
+
+
+def migrate_threads(batch_size=500):
+    # All such comments are top-level: replies were only ever written with their thread fields
+    comments = Comment._get_collection()
+    cursor = comments.find({'ancestors': {'$exists': False}}, {'_id': 1}).batch_size(batch_size)
+    updated = 0
+    ops = []
+    for row in cursor:
+        fields = thread_fields(row['_id'], None, 0)
+        del fields['replyCount'] # Replies written since threads shipped have counted themselves
+        ops.append(UpdateOne({'_id': row['_id'], 'ancestors': {'$exists': False}}, {'$set': fields}))
+        if len(ops) >= batch_size:
+            comments.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops.clear()
+    if ops:
+        comments.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    print(f"{updated} comments given thread fields")
+    return 0
@@ -0,0 +1,49 @@
+import datetime
+from pymongo import UpdateOne
+from models.like import Like
+from models.post_message import PostMessage
+from services.like_ingest import recount as recount_posts
+
+# Moves likes from the legacy PostMessage.likes arrays into the likes collection.
+#   python manage.py migrate-likes            posts that still have a likes array: upsert one
+#                                             like per (post, user), set likeCount from the
+#                                             collection, drop the array
+#   python manage.py migrate-likes --recount  set likeCount from the collection for every post,
+#                                             e.g. after a crash between a like and its $inc
+# Safe to re-run and to run while the app serves traffic: likes are upserted, and each batch
+# of posts is recounted after its likes are in. Run ensure-indexes first; the unique
+# (post, user) index is what makes the upserts idempotent.
+# A user who unlikes a post between the deploy and the migration of that post is liked again,
+# because the array still names them.
+
+
+def migrate_likes(batch_size=500, recount=False):
+    posts = PostMessage._get_collection()
+    query = {} if recount else {'likes': {'$exists': True}}
+    cursor = posts.find(query, {'likes': 1}).sort('_id', 1).batch_size(batch_size)
+    migrated = likes = 0
+    batch = []
+    def flush():
+        nonlocal migrated, likes
+        if not recount:
+            now = datetime.datetime.now(datetime.timezone.utc) # When they were liked is not recorded
+            ops = [UpdateOne({'post': row['_id'], 'user': user_id}, {'$setOnInsert': {'createdAt': now}}, upsert=True)
+                   for row in batch for user_id in set(row.get('likes') or []) if isinstance(user_id, str) and user_id]
+            if ops:
+                Like._get_collection().bulk_write(ops, ordered=False)
+            likes += len(ops)
+        post_ids = [row['_id'] for row in batch]
+        recount_posts(post_ids)
+        if not recount:
+            posts.update_many({'_id': {'$in': post_ids}}, {'$unset': {'likes': ''}})
+        migrated += len(batch)
+        batch.clear()
+
+    for row in cursor:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    print(f"{migrated} posts {'recounted' if recount else 'migrated'}" + ('' if recount else f", {likes} likes copied"))
+    return 0